@@ -0,0 +1,133 @@
+# bench_minimizer.py
+"""
+对比HTML精简阶段开启前后的解析和正文提取耗时。
+
+用法：
+    python benchmarks/bench_minimizer.py [页面目录] [--rounds N]
+
+页面目录中的 *.html 文件作为测试语料（可用浏览器“另存为”保存真实页面）；
+未指定目录时使用脚本生成的模拟文章页面，其脚本、样式、SVG和JSON数据的比例接近常见新闻站点，
+另有几个包含<svg-icon>等自定义元素和自闭合<svg/>的页面，用于检查精简阶段不会误删正文。
+"""
+import os
+import sys
+import glob
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_parser import parse_html, available_backends  # noqa: E402
+from html_minimizer import minimize_html  # noqa: E402
+from extractor import extract_main_text  # noqa: E402
+
+
+def generate_page(seed):
+    """
+    生成一个模拟文章页面：少量正文段落，大量内联脚本、样式、SVG图标和注释。
+    """
+    rng = random.Random(seed)
+    words = ['search', 'engine', 'result', 'content', 'network', 'latency', 'parser', 'page']
+    sentence = lambda: ' '.join(rng.choice(words) for _ in range(rng.randint(8, 20))) + '.'
+    parts = ['<!DOCTYPE html><html><head><meta charset="utf-8"><title>Fixture</title>']
+    for _ in range(rng.randint(5, 15)):
+        parts.append('<style>' + ''.join(
+            f'.c{rng.randint(0, 9999)}{{margin:{rng.randint(0, 20)}px;color:#{rng.randint(0, 0xffffff):06x}}}'
+            for _ in range(rng.randint(100, 400))
+        ) + '</style>')
+    for _ in range(rng.randint(10, 30)):
+        parts.append('<script>' + ';'.join(
+            f'var v{rng.randint(0, 9999)}=function(a,b){{return a<b?a:b}}'
+            for _ in range(rng.randint(50, 300))
+        ) + '</script>')
+    parts.append('<script type="application/json">{"state":[' + ','.join(
+        f'{{"id":{i},"name":"item{i}","tags":["a","b"]}}' for i in range(rng.randint(500, 2000))
+    ) + ']}</script></head><body>')
+    parts.append('<header><nav>' + ''.join(
+        f'<a href="/s{i}">Section {i}</a><svg viewBox="0 0 24 24"><path d="M{i} 0L24 24Z"/></svg>'
+        for i in range(20)
+    ) + '</nav></header>')
+    parts.append('<article><h1>Fixture article</h1>')
+    for _ in range(rng.randint(10, 30)):
+        parts.append(f'<!-- ad slot {rng.randint(0, 99)} --><p>{sentence()} {sentence()}</p>')
+        if rng.random() < 0.3:
+            parts.append('<svg width="16" height="16">' + ''.join(
+                f'<path d="M{rng.randint(0, 16)} {rng.randint(0, 16)}L16 16Z"/>' for _ in range(50)
+            ) + '</svg>')
+    parts.append('</article><footer><p>Copyright</p></footer></body></html>')
+    return ''.join(parts)
+
+
+def generate_custom_element_page(seed):
+    """
+    生成包含<svg-icon>、<script-loader>等自定义元素和自闭合<svg/>的文章页面，
+    其标签名以需删除的标签名开头，精简阶段不应把它们当作脚本或SVG处理，也不应删除自闭合SVG之后的内容。
+    """
+    rng = random.Random(seed)
+    words = ['custom', 'element', 'icon', 'card', 'loader', 'article', 'text', 'page']
+    sentence = lambda: ' '.join(rng.choice(words) for _ in range(rng.randint(8, 20))) + '.'
+    parts = ['<!DOCTYPE html><html><head><title>Custom</title><script>var a=1;</script></head>',
+             '<body><article><h1>Custom elements</h1>']
+    for i in range(rng.randint(8, 16)):
+        parts.append(f'<p>{sentence()} {sentence()}</p>')
+        tag = rng.choice(('svg-icon', 'script-loader', 'template-card', 'style-box'))
+        parts.append(f'<{tag} data-id="{i}">{sentence()}</{tag}>')
+        if rng.random() < 0.5:
+            parts.append(f'<svg class="icon"/><p>{sentence()}</p><ul><li>{sentence()}</li></ul>'
+                         '<svg viewBox="0 0 16 16"><path d="M0 0L16 16Z"/></svg>')
+    parts.append('</article></body></html>')
+    return ''.join(parts)
+
+
+def load_corpus(directory):
+    if not directory:
+        return ([generate_page(seed) for seed in range(20)]
+                + [generate_custom_element_page(seed) for seed in range(5)])
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+        with open(path, 'rb') as f:
+            pages.append(f.read().decode('utf-8', errors='replace'))
+    return pages
+
+
+def run(pages, backend, minimize, rounds):
+    timings = []
+    outputs = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        outputs = []
+        for page in pages:
+            text = minimize_html(page) if minimize else page
+            outputs.append(extract_main_text(parse_html(text, backend)))
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTML精简阶段基准测试')
+    parser.add_argument('directory', nargs='?', help='包含 *.html 测试页面的目录')
+    parser.add_argument('--rounds', type=int, default=5, help='每种配置的重复次数')
+    args = parser.parse_args()
+
+    pages = load_corpus(args.directory)
+    if not pages:
+        sys.exit(f"目录中没有 *.html 文件：{args.directory}")
+    total_chars = sum(len(page) for page in pages)
+    started = time.perf_counter()
+    minimized_chars = sum(len(minimize_html(page)) for page in pages)
+    minimize_seconds = time.perf_counter() - started
+    print(f"页面数: {len(pages)}，原始字符数: {total_chars}，精简后: {minimized_chars} "
+          f"({minimized_chars / total_chars:.1%})，精简耗时: {minimize_seconds * 1000:.1f} ms")
+
+    for backend in available_backends():
+        baseline, baseline_outputs = run(pages, backend, False, args.rounds)
+        minimized, minimized_outputs = run(pages, backend, True, args.rounds)
+        same = sum(a == b for a, b in zip(baseline_outputs, minimized_outputs))
+        print(f"{backend:12} 原始: {baseline * 1000:8.1f} ms  精简: {minimized * 1000:8.1f} ms  "
+              f"加速: {baseline / minimized:4.2f}x  提取结果一致: {same}/{len(pages)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+# concurrency.py
+import time
+import asyncio
+import logging
+import statistics
+import threading
+from collections import deque
+import config
+import http_client
+from host_scheduler import classify_outcome
+
+# 等待并发名额时的轮询间隔（秒），期间检查任务是否被中断
+WAIT_INTERVAL = 0.05
+
+
+class ConcurrencyPermit:
+    """
+    已获得的并发名额，退出时根据请求结果和耗时调整并发上限。
+    """
+    def __init__(self, controller, worker, failures, saturated):
+        self.controller = controller
+        self.worker = worker
+        self.failures = failures
+        self.saturated = saturated
+        self.started_at = time.monotonic()
+        self._failed = False
+
+    def mark_failed(self):
+        """
+        调用方自行处理了超时或连接失败时，用此方法计入拥塞信号。
+        """
+        self._failed = True
+
+    def _release(self, exc):
+        outcome = classify_outcome(exc, self.failures, self.worker, self._failed)
+        self.controller.release(self, outcome)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._release(exc)
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._release(exc)
+        return False
+
+
+class ConcurrencyController:
+    """
+    AIMD方式自适应调整页面抓取的并发数：
+    并发名额用满且请求正常完成时，每完成一轮（约limit个请求）上限加一；
+    出现超时、连接失败或耗时超过近期中位数的若干倍时，上限乘以回退系数。
+    上限始终保持在[floor, ceiling]之间。
+    """
+    def __init__(self, initial=None, floor=None, ceiling=None):
+        self.floor = floor or config.CONCURRENCY_FLOOR
+        self.ceiling = max(ceiling or config.CONCURRENCY_CEILING, self.floor)
+        self.limit = float(min(max(initial or config.FETCH_MAX_WORKERS, self.floor), self.ceiling))
+        self.active = 0
+        self._latencies = deque(maxlen=config.CONCURRENCY_LATENCY_WINDOW)
+        # 上次回退的时间，此前发出的请求带来的拥塞信号不再重复回退
+        self._decreased_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {
+            'increases': 0,
+            'decreases': 0,
+            'waits': 0,
+            'peak_limit': self.limit,
+            'lowest_limit': self.limit,
+        }
+
+    @property
+    def enabled(self):
+        return config.ADAPTIVE_CONCURRENCY
+
+    @property
+    def capacity(self):
+        """
+        当前允许同时进行的抓取数量。
+        """
+        return int(self.limit)
+
+    def _try_acquire(self, worker, failures, counted):
+        with self._lock:
+            if self.enabled and self.active >= int(self.limit):
+                if not counted:
+                    counted.add('waits')
+                    self._stats['waits'] += 1
+                return None
+            self.active += 1
+            # 只有名额用满时的成功才说明还有余量，未用满时增加上限没有依据
+            saturated = self.active >= int(self.limit)
+            return ConcurrencyPermit(self, worker, failures, saturated)
+
+    def permit(self, worker=None, failures=()):
+        """
+        阻塞等待一个并发名额，返回上下文管理器。
+        failures为视为拥塞的异常类型；任务中断或超出时间预算时抛出FetchAborted。
+        """
+        counted = set()
+        while True:
+            permit = self._try_acquire(worker, failures, counted)
+            if permit is not None:
+                return permit
+            if http_client.should_stop(worker):
+                raise http_client.FetchAborted("等待并发名额时任务被中断")
+            time.sleep(WAIT_INTERVAL)
+
+    async def async_permit(self, worker=None, failures=()):
+        """
+        permit的异步版本，等待期间不阻塞事件循环，返回异步上下文管理器。
+        """
+        counted = set()
+        while True:
+            permit = self._try_acquire(worker, failures, counted)
+            if permit is not None:
+                return permit
+            if http_client.should_stop(worker):
+                raise http_client.FetchAborted("等待并发名额时任务被中断")
+            await asyncio.sleep(WAIT_INTERVAL)
+
+    def _congested(self, latency):
+        if len(self._latencies) < config.CONCURRENCY_MIN_SAMPLES:
+            return False
+        return latency > statistics.median(self._latencies) * config.CONCURRENCY_LATENCY_FACTOR
+
+    def release(self, permit, outcome):
+        """
+        归还名额。outcome为'failure'或耗时明显变长时减小上限，
+        名额用满且正常完成时增大上限，为None（中断）时不调整。
+        """
+        latency = time.monotonic() - permit.started_at
+        with self._lock:
+            self.active -= 1
+            if not self.enabled or outcome is None:
+                return
+            congested = outcome == 'failure' or self._congested(latency)
+            if outcome == 'success':
+                self._latencies.append(latency)
+            if congested:
+                if permit.started_at < self._decreased_at:
+                    return
+                limit = max(self.limit * config.CONCURRENCY_DECREASE_FACTOR, self.floor)
+                if limit < self.limit:
+                    logging.info(
+                        f"抓取出现拥塞（{'请求失败' if outcome == 'failure' else f'耗时 {latency:.2f} 秒'}），"
+                        f"并发上限 {self.limit:.1f} -> {limit:.1f}"
+                    )
+                    self.limit = limit
+                    self._stats['decreases'] += 1
+                    self._stats['lowest_limit'] = min(self._stats['lowest_limit'], limit)
+                self._decreased_at = time.monotonic()
+            elif permit.saturated and self.limit < self.ceiling:
+                self.limit = min(self.limit + 1 / self.limit, self.ceiling)
+                self._stats['increases'] += 1
+                self._stats['peak_limit'] = max(self._stats['peak_limit'], self.limit)
+
+    def get_stats(self):
+        """
+        返回统计信息的副本：当前上限、上调和回退次数、等待次数以及上限的最高和最低值。
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['limit'] = self.limit
+            stats['active'] = self.active
+            stats['samples'] = len(self._latencies)
+        for key in ('limit', 'peak_limit', 'lowest_limit'):
+            stats[key] = round(stats[key], 2)
+        return stats
+
+
+_concurrency_controller = ConcurrencyController()
+
+
+def get_concurrency_controller():
+    """
+    获取进程内共享的并发控制器。
+    """
+    return _concurrency_controller
+
+
+def get_stats():
+    return _concurrency_controller.get_stats()
@@ -0,0 +1,214 @@
+# config.py
+"""
+全局配置项，集中管理网络请求、抓取等可调参数。
+"""
+import os
+
+# 所有请求共用的默认请求头
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/113.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
+}
+
+# 请求超时时间（秒）
+REQUEST_TIMEOUT = 10
+
+# 整次搜索的时间预算（秒），0表示不限制；超时后未完成的结果使用摘要代替正文
+SEARCH_TIME_BUDGET = 0
+
+# 时间预算将尽时单个请求的最短超时（秒）
+MIN_REQUEST_TIMEOUT = 0.5
+
+# 页面抓取遇到临时性错误（连接失败、下列状态码）的重试次数，0表示不重试；读取超时和搜索引擎请求不重试
+HTTP_RETRIES = 2
+
+# 重试间隔的退避系数：第一次立即重试，第n次重试前等待 HTTP_RETRY_BACKOFF * 2**(n-1) 秒
+HTTP_RETRY_BACKOFF = 0.3
+
+# 视为临时性错误、需要重试的HTTP状态码
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# 对冲请求：页面超过近期抓取耗时的分位数仍未完成时，再发送一个相同请求，取先完成者
+HEDGE_ENABLED = True
+
+# 触发对冲请求的耗时分位数
+HEDGE_QUANTILE = 0.9
+
+# 计算分位数至少需要的耗时样本数，不足时使用默认延迟
+HEDGE_MIN_SAMPLES = 10
+
+# 样本不足时的对冲延迟（秒）
+HEDGE_DEFAULT_DELAY = 3.0
+
+# 对冲延迟的下限（秒），避免对快速页面发送多余请求
+HEDGE_MIN_DELAY = 0.5
+
+# 保留的最近耗时样本数
+HEDGE_WINDOW = 200
+
+# 每个主机同时进行的最大请求数
+HOST_MAX_CONNECTIONS = 4
+
+# 按主机限速：主机名 -> (每秒请求数, 突发上限)，避免大批量搜索时被搜索引擎限流
+HOST_RATE_LIMITS = {
+    'www.google.com': (1.0, 3),
+    'www.bing.com': (2.0, 4),
+    'www.baidu.com': (2.0, 4),
+}
+
+# 未在HOST_RATE_LIMITS中列出的主机的限速，None表示不限速
+HOST_DEFAULT_RATE_LIMIT = None
+
+# 熔断：同一主机连续超时或连接失败达到此次数后暂停访问
+CIRCUIT_FAILURE_THRESHOLD = 3
+
+# 熔断后的冷却时间（秒），期间对该主机的请求直接失败
+CIRCUIT_COOLDOWN = 300
+
+# 进程内DNS缓存：所有抓取线程共用解析结果，减少重复的域名解析
+DNS_CACHE_ENABLED = True
+
+# DNS缓存的有效期（秒）
+DNS_CACHE_TTL = 300
+
+# 启动程序和切换搜索引擎时在后台预热：启动抓取引擎，提前解析并连接搜索引擎主机
+PREWARM_ENABLED = True
+
+# 同一主机两次预热的最短间隔（秒）
+PREWARM_MIN_INTERVAL = 60
+
+# 连接池中缓存的主机数量
+HTTP_POOL_CONNECTIONS = 32
+
+# 每个主机保持的最大连接数
+HTTP_POOL_MAXSIZE = 10
+
+# 页面抓取引擎：'thread' 使用共享线程池，'async' 使用asyncio（需安装aiohttp）
+FETCH_BACKEND = 'thread'
+
+# 线程池抓取引擎的并发线程数；启用自适应并发时作为初始并发上限
+FETCH_MAX_WORKERS = 5
+
+# 自适应并发：延迟和错误率正常时逐步提高页面抓取并发数，出现拥塞时成倍回退
+ADAPTIVE_CONCURRENCY = True
+
+# 自适应并发的下限和上限；启用时线程池按上限创建线程
+CONCURRENCY_FLOOR = 2
+CONCURRENCY_CEILING = 32
+
+# 出现拥塞时并发上限乘以的系数
+CONCURRENCY_DECREASE_FACTOR = 0.5
+
+# 单个页面耗时超过近期耗时中位数的此倍数时视为拥塞
+CONCURRENCY_LATENCY_FACTOR = 3.0
+
+# 判断耗时是否异常至少需要的样本数，以及保留的最近样本数
+CONCURRENCY_MIN_SAMPLES = 10
+CONCURRENCY_LATENCY_WINDOW = 100
+
+# 异步抓取引擎允许同时进行的下载数
+ASYNC_MAX_CONCURRENCY = 100
+
+# 异步抓取引擎中用于解码和解析页面的线程数
+ASYNC_PARSE_WORKERS = 4
+
+# 在独立的进程池中解码页面和提取正文，避免解析受GIL限制；进程池在多次搜索之间常驻
+PARSE_IN_PROCESSES = True
+
+# 解析进程数，0表示与CPU核心数相同
+PARSE_PROCESSES = 0
+
+# 增量提取：线程池抓取引擎边下载边解析并提取正文，代替下载完成后交给解析进程池。
+# 仅在页面声明了编码时生效，未声明时仍按常规流程处理
+STREAM_EXTRACT = False
+
+# 增量提取时收集到此数量的正文字符后提前结束下载，0表示总是下载完整页面
+STREAM_EXTRACT_STOP_CHARS = 20000
+
+# 同时请求搜索结果页面的最大关键词数
+SERP_MAX_WORKERS = 4
+
+# 各搜索引擎单个结果页的最大结果数，需要更多结果时并行请求多个结果页
+SERP_PAGE_SIZES = {
+    'Google': 10,
+    'Bing': 10,
+    '百度': 10,
+}
+
+# 单次搜索最多请求的结果页数
+SERP_MAX_PAGES = 5
+
+# 界面中每个关键词可选的最大结果数
+MAX_NUM_RESULTS = 50
+
+# 超量抓取模式：请求 结果数×倍数 个搜索结果并同时抓取，
+# 每个关键词得到指定数量的有效页面后取消其余请求
+OVERFETCH_ENABLED = False
+OVERFETCH_FACTOR = 2
+
+# 超量抓取模式下有效页面正文的最少字符数
+USABLE_CONTENT_MIN_LENGTH = 200
+
+# 解析搜索结果页后立即并行解析百度的跳转链接，用实际URL去重和抓取页面
+REDIRECT_RESOLVE_ENABLED = True
+
+# 并行解析跳转链接的线程数
+REDIRECT_RESOLVE_WORKERS = 8
+
+# 解析单个跳转链接的超时时间（秒）
+REDIRECT_RESOLVE_TIMEOUT = 3
+
+# 跳转链接缓存的保留时间（秒）
+REDIRECT_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+
+# 多引擎结果融合时倒数排名融合（RRF）的平滑常数
+RRF_K = 60
+
+# 本地缓存目录
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.onlinegpt')
+
+# 是否启用页面内容缓存
+PAGE_CACHE_ENABLED = True
+
+# 页面缓存直接命中的有效期（秒），过期后通过条件请求重新验证
+PAGE_CACHE_TTL = 6 * 60 * 60
+
+# 页面缓存条目的最长保留时间（秒）
+PAGE_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+
+# 搜索结果页缓存的有效期（秒）
+SERP_CACHE_TTL = 10 * 60
+
+# 搜索结果页缓存的最大条目数
+SERP_CACHE_MAX_ENTRIES = 200
+
+# 单个页面允许下载的最大字节数，超过部分直接丢弃
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+
+# 流式下载时每次读取的块大小（字节）
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# 查找<meta charset>声明时扫描的页面开头字节数
+META_SCAN_BYTES = 4096
+
+# 编码声明均不可用时，交给charset_normalizer检测的样本字节数
+ENCODING_SAMPLE_BYTES = 64 * 1024
+
+# 解析页面前删除script、style、svg等元素和HTML注释
+HTML_MINIMIZE = True
+
+# 解析搜索结果页前先截取结果区域，并只为结果容器建树
+SERP_PRESCAN = True
+
+# HTML解析后端：'auto' 自动选择已安装的最快后端，也可指定 'selectolax'、'lxml' 或 'html.parser'
+HTML_PARSER = 'auto'
+
+# 正文提取：最佳区域文本少于此字符数时退回到全文段落
+MIN_CONTENT_LENGTH = 200
+
+# 正文提取：链接文本占比超过此值的段落视为导航或列表，不计入正文
+MAX_LINK_DENSITY = 0.5
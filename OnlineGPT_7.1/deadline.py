@@ -0,0 +1,34 @@
+# deadline.py
+import time
+import config
+
+
+class Deadline:
+    """
+    整次搜索的时间预算。
+    搜索结果页请求和页面抓取共用同一个截止时间，单个请求的超时随剩余时间缩短。
+    """
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, default=None):
+        """
+        返回下一个请求可用的超时时间：不超过默认超时，也不超过剩余预算。
+        """
+        if default is None:
+            default = config.REQUEST_TIMEOUT
+        return max(min(default, self.remaining()), config.MIN_REQUEST_TIMEOUT)
+
+
+def request_timeout(deadline):
+    """
+    没有时间预算时使用默认超时，否则按剩余预算缩短。
+    """
+    return deadline.timeout() if deadline is not None else config.REQUEST_TIMEOUT
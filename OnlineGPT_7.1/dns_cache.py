@@ -0,0 +1,69 @@
+# dns_cache.py
+import time
+import socket
+import logging
+import threading
+import config
+
+# 超过此条目数时清理已过期的条目
+MAX_ENTRIES = 1000
+
+_original_getaddrinfo = socket.getaddrinfo
+_installed = False
+_entries = {}
+_lock = threading.Lock()
+_stats = {
+    'hits': 0,
+    'misses': 0,
+}
+
+
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    """
+    带TTL缓存的socket.getaddrinfo，所有抓取线程和异步引擎共用；解析失败不缓存。
+    """
+    key = (host, port, family, type, proto, flags)
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] > now:
+            _stats['hits'] += 1
+            return list(entry[1])
+    result = _original_getaddrinfo(host, port, family, type, proto, flags)
+    with _lock:
+        _stats['misses'] += 1
+        if len(_entries) >= MAX_ENTRIES:
+            for expired in [k for k, (expires_at, _) in _entries.items() if expires_at <= now]:
+                del _entries[expired]
+        _entries[key] = (now + config.DNS_CACHE_TTL, result)
+    return list(result)
+
+
+def install():
+    """
+    用带缓存的版本替换socket.getaddrinfo，重复调用无影响。
+    """
+    global _installed
+    if not config.DNS_CACHE_ENABLED:
+        return
+    with _lock:
+        if _installed:
+            return
+        socket.getaddrinfo = _cached_getaddrinfo
+        _installed = True
+    logging.info(f"已启用DNS缓存，有效期: {config.DNS_CACHE_TTL} 秒")
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def get_stats():
+    """
+    返回DNS缓存命中统计的副本。
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats['entries'] = len(_entries)
+    return stats
@@ -0,0 +1,180 @@
+# encoding.py
+import re
+import codecs
+import logging
+import threading
+import urllib.parse
+import charset_normalizer
+import config
+
+# 常见字节顺序标记及其编码，按长度从长到短排列
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# 能解码任意字节的单字节编码，严格解码无法验证其正确性
+_PERMISSIVE_ENCODINGS = {'iso8859-1', 'cp1252', 'ascii'}
+
+_HEADER_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+_META_CHARSET_RE = re.compile(
+    rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.I
+)
+
+# 各检测路径的命中次数
+_stats = {
+    'bom': 0,
+    'header': 0,
+    'meta': 0,
+    'domain_memo': 0,
+    'utf-8': 0,
+    'charset_normalizer': 0,
+    'fallback': 0,
+}
+_stats_lock = threading.Lock()
+
+# 每个域名最近一次检测到的编码
+_domain_memo = {}
+_domain_memo_lock = threading.Lock()
+
+
+def _count(path):
+    with _stats_lock:
+        _stats[path] += 1
+
+
+def get_stats():
+    """
+    返回各编码检测路径命中次数的副本。
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def add_stats(counts):
+    """
+    累加在其他进程中统计的命中次数。
+    """
+    with _stats_lock:
+        for path, count in counts.items():
+            _stats[path] += count
+
+
+def _normalize_encoding(name):
+    """
+    将编码名转换为Python可识别的规范名称，无法识别时返回None。
+    """
+    if not name:
+        return None
+    name = name.strip().lower()
+    # 网页中声明的gb2312/gbk通常实际为gb18030的子集
+    if name in ('gb2312', 'gbk', 'x-gbk'):
+        name = 'gb18030'
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def _try_decode(content, encoding):
+    """
+    用严格模式解码，验证编码是否可信；成功返回文本，失败返回None。
+    """
+    try:
+        return content.decode(encoding)
+    except (UnicodeDecodeError, LookupError):
+        return None
+
+
+def _domain(url):
+    return urllib.parse.urlsplit(url).netloc.lower() if url else ''
+
+
+def declared_encoding(head, content_type=''):
+    """
+    只根据BOM、HTTP响应头和<meta>声明确定编码，供边下载边解码时使用。
+    没有声明或声明为单字节编码（无法校验，常被误标）时返回None，由调用方下载完整内容后再检测。
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            _count('bom')
+            return encoding
+    candidates = []
+    match = _HEADER_CHARSET_RE.search(content_type or '')
+    if match:
+        candidates.append(('header', match.group(1)))
+    match = _META_CHARSET_RE.search(head[:config.META_SCAN_BYTES])
+    if match:
+        candidates.append(('meta', match.group(1).decode('ascii', errors='ignore')))
+    for path, name in candidates:
+        encoding = _normalize_encoding(name)
+        if encoding:
+            if encoding in _PERMISSIVE_ENCODINGS:
+                return None
+            _count(path)
+            return encoding
+    return None
+
+
+def decode_html(content, content_type='', url=None):
+    """
+    解码HTML字节，返回 (文本, 编码)。
+    依次尝试BOM、HTTP响应头、<meta>声明、UTF-8和同域名上次的编码，每一步都用严格解码验证，
+    全部失败才用charset_normalizer检测一段有限长度的样本。
+    """
+    for bom, encoding in _BOMS:
+        if content.startswith(bom):
+            _count('bom')
+            return content.decode(encoding, errors='replace'), encoding
+
+    candidates = []
+    match = _HEADER_CHARSET_RE.search(content_type or '')
+    if match:
+        candidates.append(('header', match.group(1)))
+    match = _META_CHARSET_RE.search(content[:config.META_SCAN_BYTES])
+    if match:
+        candidates.append(('meta', match.group(1).decode('ascii', errors='ignore')))
+    # UTF-8的严格校验区分度很高，放在同域名记录之前
+    candidates.append(('utf-8', 'utf-8'))
+    domain = _domain(url)
+    with _domain_memo_lock:
+        memo = _domain_memo.get(domain)
+    if memo:
+        candidates.append(('domain_memo', memo))
+
+    # 单字节编码排到UTF-8之后，避免把误标为ISO-8859-1的UTF-8页面解成乱码
+    normalized = [(path, _normalize_encoding(name)) for path, name in candidates]
+    normalized.sort(key=lambda candidate: (
+        candidate[1] in _PERMISSIVE_ENCODINGS and candidate[0] != 'utf-8'
+    ))
+
+    tried = set()
+    for path, encoding in normalized:
+        if not encoding or encoding in tried:
+            continue
+        tried.add(encoding)
+        text = _try_decode(content, encoding)
+        if text is not None:
+            _count(path)
+            _remember(domain, encoding)
+            return text, encoding
+
+    detected = charset_normalizer.from_bytes(content[:config.ENCODING_SAMPLE_BYTES]).best()
+    if detected and detected.encoding:
+        _count('charset_normalizer')
+        _remember(domain, detected.encoding)
+        encoding = detected.encoding
+    else:
+        _count('fallback')
+        logging.debug(f"无法确定编码，使用utf-8：{url}")
+        encoding = 'utf-8'
+    return content.decode(encoding, errors='replace'), encoding
+
+
+def _remember(domain, encoding):
+    if domain:
+        with _domain_memo_lock:
+            _domain_memo[domain] = encoding
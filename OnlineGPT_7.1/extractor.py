@@ -0,0 +1,324 @@
+# extractor.py
+import re
+from html.parser import HTMLParser
+import config
+
+# 整棵子树都跳过的标签
+SKIP_TAGS = {
+    'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'canvas',
+    'nav', 'aside', 'form', 'button', 'select', 'head',
+}
+
+# 页眉页脚只在正文区域之外跳过，<article>内的<header>通常包含文章标题
+PAGE_CHROME_TAGS = {'header', 'footer'}
+
+# 正文区域标签
+ARTICLE_TAGS = {'article', 'main'}
+
+# 独立成段的块级标签
+BLOCK_TAGS = {
+    'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'pre', 'blockquote',
+    'dd', 'dt', 'td', 'th', 'figcaption', 'caption',
+}
+
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+
+# 作为正文候选区域参与打分的容器标签
+CONTAINER_TAGS = {'body', 'div', 'article', 'section', 'main', 'ul', 'ol', 'table'}
+
+# 容器标签本身的权重，语义化标签更可能包含正文
+CONTAINER_TAG_WEIGHTS = {'article': 1.5, 'main': 1.3, 'section': 1.1}
+
+# 没有结束标签的元素，增量解析时不入栈
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'param', 'source', 'track', 'wbr',
+}
+
+# 增量解析时遇到这些开始标签，会隐式结束仍未闭合的同类元素（如连续的<li>）
+IMPLIED_END_TAGS = {
+    'li': {'li'},
+    'dt': {'dt', 'dd'},
+    'dd': {'dt', 'dd'},
+    'td': {'td', 'th'},
+    'th': {'td', 'th'},
+    'tr': {'tr', 'td', 'th'},
+    'p': {'p'},
+}
+
+# class/id中出现这些词的元素视为样板内容
+NEGATIVE_HINT_RE = re.compile(
+    r'comment|sidebar|footer|footnote|menu|breadcrumb|share|social|related|'
+    r'advert|banner|sponsor|popup|cookie|nav|pager|pagination|widget',
+    re.I
+)
+POSITIVE_HINT_RE = re.compile(r'article|content|post|entry|main|text|body|story', re.I)
+
+# 文本中出现这些标点说明是自然语言段落
+PUNCTUATION_RE = re.compile(r'[,.;:!?，。；：！？、]')
+
+
+def _hints(node):
+    return f"{node.attr('class') or ''} {node.attr('id') or ''}"
+
+
+class _BlockCollector:
+    """
+    按文档顺序接收元素的进入、离开事件和文本，把文本归入最近的块级元素，
+    记录每个块所在的容器路径，最后按文本量和链接密度选出正文。
+    树遍历和增量解析共用同一套打分逻辑。
+    """
+    def __init__(self):
+        self.blocks = []
+        # 每个块所在的容器ID路径，用于判断块是否位于某容器内
+        self.block_paths = []
+        # 容器ID -> 累计得分
+        self.containers = {}
+        self.container_weights = {}
+        self.container_path = []
+        self.current_block = None
+        self.block_stack = []
+        self.link_depth = 0
+        # 当前所在的<article>/<main>层数
+        self.article_depth = 0
+        # 已收集的非链接文本字符数，用于判断是否已得到足够的正文
+        self.content_chars = 0
+
+    def _new_block(self, heading):
+        self.current_block = {
+            'segments': [], 'chars': 0, 'link_chars': 0,
+            'heading': heading,
+        }
+        self.blocks.append(self.current_block)
+        self.block_paths.append(tuple(self.container_path))
+
+    def text(self, text):
+        text = text.strip()
+        if not text:
+            return
+        if self.current_block is None:
+            # 容器中直接出现的文本作为一个隐式段落
+            self._new_block(False)
+        self.current_block['segments'].append(text)
+        self.current_block['chars'] += len(text)
+        if self.link_depth:
+            self.current_block['link_chars'] += len(text)
+        else:
+            self.content_chars += len(text)
+
+    def skips(self, tag, hints):
+        """
+        脚本、样式、导航等样板元素整棵子树都跳过；页眉页脚只在正文区域之外跳过。
+        """
+        if tag in SKIP_TAGS:
+            return True
+        if tag in PAGE_CHROME_TAGS and not self.article_depth:
+            return True
+        return tag not in ('body', 'html') and bool(NEGATIVE_HINT_RE.search(hints)) \
+            and not POSITIVE_HINT_RE.search(hints)
+
+    def enter(self, tag, hints):
+        if tag == 'a':
+            self.link_depth += 1
+        if tag in ARTICLE_TAGS:
+            self.article_depth += 1
+        if tag in BLOCK_TAGS:
+            self.block_stack.append(self.current_block)
+            self._new_block(tag in HEADING_TAGS)
+        elif tag in CONTAINER_TAGS:
+            container_id = len(self.containers)
+            self.containers[container_id] = 0.0
+            weight = CONTAINER_TAG_WEIGHTS.get(tag, 1.0)
+            if POSITIVE_HINT_RE.search(hints):
+                weight *= 1.25
+            self.container_weights[container_id] = weight
+            self.container_path.append(container_id)
+            self.block_stack.append(self.current_block)
+            # 容器内的直接文本另起一个隐式段落
+            self.current_block = None
+
+    def leave(self, tag):
+        if tag == 'a':
+            self.link_depth -= 1
+        if tag in ARTICLE_TAGS:
+            self.article_depth -= 1
+        if tag in BLOCK_TAGS:
+            self.current_block = self.block_stack.pop()
+        elif tag in CONTAINER_TAGS:
+            self.container_path.pop()
+            self.current_block = self.block_stack.pop()
+
+    def result(self):
+        blocks = self.blocks
+        containers = self.containers
+
+        # 按段落文本量和链接密度为所在容器及其上一级容器打分
+        for block, path in zip(blocks, self.block_paths):
+            if not block['chars'] or not path:
+                continue
+            link_density = block['link_chars'] / block['chars']
+            score = block['chars'] * (1 - link_density)
+            if PUNCTUATION_RE.search(''.join(block['segments'])):
+                score *= 1.5
+            containers[path[-1]] += score
+            if len(path) > 1:
+                containers[path[-2]] += score / 2
+
+        def usable(block):
+            if not block['chars']:
+                return False
+            if block['heading']:
+                return True
+            return block['link_chars'] / block['chars'] <= config.MAX_LINK_DENSITY
+
+        selected = []
+        if containers:
+            best_id = max(
+                containers,
+                key=lambda container_id: containers[container_id] * self.container_weights[container_id]
+            )
+            selected = [
+                block for block, path in zip(blocks, self.block_paths)
+                if best_id in path and usable(block)
+            ]
+
+        text = '\n\n'.join('\n'.join(block['segments']) for block in selected)
+        if len(text) < config.MIN_CONTENT_LENGTH:
+            # 正文区域不明显时使用全文中可用的段落
+            text = '\n\n'.join(
+                '\n'.join(block['segments']) for block in blocks if usable(block)
+            )
+        return text
+
+
+def extract_main_text(document):
+    """
+    单次遍历文档树提取正文。
+    遍历时跳过脚本、样式、导航、页脚等样板内容，把文本归入最近的块级元素，
+    并按文本量和链接密度给所在容器打分；最后输出得分最高容器内的段落。
+    正文过短时退回到全文中链接密度较低的段落。
+    """
+    root = document.css_first('body') or document
+    collector = _BlockCollector()
+
+    # 栈中元素为 (节点或文本, 是否为离开事件)
+    stack = [(root, False)]
+    while stack:
+        item, leaving = stack.pop()
+
+        if isinstance(item, str):
+            collector.text(item)
+            continue
+
+        tag = item.tag
+        if leaving:
+            collector.leave(tag)
+            continue
+
+        hints = _hints(item)
+        if collector.skips(tag, hints):
+            continue
+        collector.enter(tag, hints)
+
+        stack.append((item, True))
+        children = list(item.children())
+        for child in reversed(children):
+            stack.append((child, False))
+
+    return collector.result()
+
+
+class IncrementalExtractor(HTMLParser):
+    """
+    推送式正文提取：页面边下载边调用feed()，不建树，直接把解析事件交给与extract_main_text相同的打分逻辑。
+    用一个开放元素栈近似浏览器的容错规则：忽略无法匹配的结束标签，结束标签会同时关闭其内部未闭合的元素，
+    新的段落、列表项或单元格隐式结束前一个。
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._collector = _BlockCollector()
+        # 开放元素栈，元素为 (标签名, 是否已交给收集器)
+        self._open = []
+        # 被跳过的元素在栈中的位置，其子树中的事件全部忽略
+        self._skip_at = None
+        # HTMLParser会在feed()的边界处拆开文本，遇到下一个标签时再合并交给收集器
+        self._pending_text = []
+
+    def _flush_text(self):
+        if self._pending_text:
+            self._collector.text(''.join(self._pending_text))
+            self._pending_text = []
+
+    @property
+    def content_chars(self):
+        """
+        已收集的非链接文本字符数。
+        """
+        return self._collector.content_chars
+
+    def _pop_to(self, index):
+        while len(self._open) > index:
+            tag, entered = self._open.pop()
+            if entered:
+                self._collector.leave(tag)
+        if self._skip_at is not None and self._skip_at >= len(self._open):
+            self._skip_at = None
+
+    def _close_implied(self, tag):
+        if self._open and self._open[-1][0] == 'p' and (tag in BLOCK_TAGS or tag in CONTAINER_TAGS):
+            self._pop_to(len(self._open) - 1)
+        closes = IMPLIED_END_TAGS.get(tag)
+        if not closes:
+            return
+        for index in range(len(self._open) - 1, -1, -1):
+            open_tag = self._open[index][0]
+            if open_tag in closes:
+                self._pop_to(index)
+                return
+            if open_tag in CONTAINER_TAGS:
+                return
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag in VOID_TAGS:
+            return
+        if self._skip_at is not None:
+            self._open.append((tag, False))
+            return
+        self._close_implied(tag)
+        attrs = dict(attrs)
+        hints = f"{attrs.get('class') or ''} {attrs.get('id') or ''}"
+        if tag == 'title' or self._collector.skips(tag, hints):
+            self._skip_at = len(self._open)
+            self._open.append((tag, False))
+            return
+        self._collector.enter(tag, hints)
+        self._open.append((tag, True))
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in VOID_TAGS:
+            self.handle_starttag(tag, attrs)
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        # body和html保持打开，其后的内容仍属于正文
+        if tag in ('body', 'html'):
+            return
+        for index in range(len(self._open) - 1, -1, -1):
+            if self._open[index][0] == tag:
+                self._pop_to(index)
+                return
+
+    def handle_data(self, data):
+        if self._skip_at is None:
+            self._pending_text.append(data)
+
+    def result(self):
+        """
+        结束解析并返回正文，之后不能再调用feed()。
+        """
+        self.close()
+        self._flush_text()
+        self._pop_to(0)
+        return self._collector.result()
@@ -0,0 +1,381 @@
+# fetch_engine.py
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, InvalidStateError
+import config
+import http_client
+from deadline import request_timeout
+from utils import get_page_content, reject_non_html, FAILURE_MESSAGES
+from page_cache import get_page_cache
+from host_scheduler import get_host_scheduler, HostUnavailable
+from concurrency import get_concurrency_controller
+from hedging import get_hedge_tracker
+from parse_pool import get_parse_pool, async_parse_page
+from url_canon import canonical_key, unwrap_link
+import dns_cache
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# 计入主机熔断状态的异常：超时和连接失败
+ASYNC_HOST_FAILURES = (asyncio.TimeoutError, aiohttp.ClientConnectionError) if aiohttp else ()
+
+
+class ThreadFetchEngine:
+    """
+    基于线程池的页面抓取引擎，线程池在多次搜索之间复用。
+    启用自适应并发时按并发上限创建线程，实际并发数由并发控制器决定。
+    """
+    def __init__(self, max_workers=None):
+        if max_workers is None:
+            max_workers = config.CONCURRENCY_CEILING if config.ADAPTIVE_CONCURRENCY else config.FETCH_MAX_WORKERS
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix='fetch'
+        )
+
+    @property
+    def capacity(self):
+        """
+        可同时进行的抓取数量。
+        """
+        if config.ADAPTIVE_CONCURRENCY:
+            return min(get_concurrency_controller().capacity, self.max_workers)
+        return self.max_workers
+
+    def submit(self, url, worker=None):
+        """
+        提交一个页面抓取任务，返回concurrent.futures.Future。
+        """
+        return self._executor.submit(get_page_content, url, worker)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+class AsyncFetchEngine:
+    """
+    基于asyncio的页面抓取引擎。
+    在后台线程中运行事件循环，用信号量代替线程控制并发，
+    少量系统线程即可同时进行大量下载。
+    """
+    def __init__(self, max_concurrency=None):
+        if aiohttp is None:
+            raise RuntimeError("未安装aiohttp，无法使用异步抓取引擎")
+        self.max_concurrency = max_concurrency or config.ASYNC_MAX_CONCURRENCY
+        self._session = None
+        self._semaphore = None
+        # 缓存读写放到少量线程中执行；未启用解析进程池时也在这些线程中解码和解析，避免阻塞事件循环
+        self._parse_executor = ThreadPoolExecutor(
+            max_workers=config.ASYNC_PARSE_WORKERS, thread_name_prefix='parse'
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run_loop, name='async-fetch', daemon=True
+        )
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def _get_session(self):
+        # 仅在事件循环线程中调用
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=config.HTTP_POOL_MAXSIZE
+            )
+            self._session = aiohttp.ClientSession(
+                headers=config.DEFAULT_HEADERS,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=config.REQUEST_TIMEOUT)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def _fetch(self, url, worker):
+        loop = asyncio.get_running_loop()
+        session = self._get_session()
+
+        # 缓存读写是磁盘操作，放到线程中执行
+        cache = get_page_cache()
+        entry = None
+        if cache and (worker is None or getattr(worker, 'use_cache', True)):
+            entry = await loop.run_in_executor(self._parse_executor, cache.get, url)
+            if entry and cache.is_fresh(entry):
+                logging.info(f"页面缓存命中：{url}")
+                return entry['content']
+        headers = cache.conditional_headers(entry) if entry else None
+
+        async with self._semaphore:
+            if http_client.should_stop(worker):
+                logging.info(f"中断获取页面内容：{url}")
+                return "任务已中断，无法获取内容"
+            # 按主机限制并发和速率，超时和连接失败计入该主机的熔断状态
+            try:
+                slot = await get_host_scheduler().async_slot(url, worker, ASYNC_HOST_FAILURES)
+            except HostUnavailable as e:
+                logging.warning(f"跳过页面 {url}：{e}")
+                return "无法获取内容"
+            except http_client.FetchAborted:
+                logging.info(f"中断获取页面内容：{url}")
+                return "任务已中断，无法获取内容"
+            async with slot:
+                # 全局并发名额由自适应并发控制器分配，根据耗时和失败情况调整
+                try:
+                    permit = await get_concurrency_controller().async_permit(worker, ASYNC_HOST_FAILURES)
+                except http_client.FetchAborted:
+                    logging.info(f"中断获取页面内容：{url}")
+                    return "任务已中断，无法获取内容"
+                async with permit:
+                    # 对冲延迟只参考实际的网络耗时，不含排队、缓存命中和失败的请求
+                    started = time.monotonic()
+                    # 与同步引擎的urllib3重试策略一致：连接错误和临时性状态码按指数退避重试，超时不重试
+                    for attempt in range(config.HTTP_RETRIES + 1):
+                        if attempt:
+                            await asyncio.sleep(http_client.retry_delay(attempt))
+                            if http_client.should_stop(worker):
+                                logging.info(f"中断获取页面内容：{url}")
+                                return "任务已中断，无法获取内容"
+                        timeout = aiohttp.ClientTimeout(total=request_timeout(getattr(worker, 'deadline', None)))
+                        try:
+                            async with session.get(url, headers=headers, timeout=timeout) as response:
+                                if response.status in config.HTTP_RETRY_STATUSES and attempt < config.HTTP_RETRIES:
+                                    logging.info(f"页面返回状态码 {response.status}，准备重试：{url}")
+                                    continue
+                                if entry and response.status == 304:
+                                    logging.info(f"页面未修改，使用缓存内容：{url}")
+                                    get_hedge_tracker().record(time.monotonic() - started)
+                                    await loop.run_in_executor(self._parse_executor, cache.touch, url)
+                                    return entry['content']
+                                response.raise_for_status()
+                                content_type = response.headers.get('Content-Type', '')
+                                etag = response.headers.get('ETag')
+                                last_modified = response.headers.get('Last-Modified')
+                                rejected = reject_non_html(content_type, url)
+                                if rejected:
+                                    return rejected
+                                content = await self._read_body(response, url, worker)
+                                if content is None:
+                                    logging.info(f"中断获取页面内容：{url}")
+                                    return "任务已中断，无法获取内容"
+                                get_hedge_tracker().record(time.monotonic() - started)
+                            break
+                        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                            if attempt < config.HTTP_RETRIES and not isinstance(e, asyncio.TimeoutError):
+                                logging.info(f"获取页面内容失败，准备重试 ({url}): {e}")
+                                continue
+                            logging.error(f"获取页面内容失败 ({url}): {e}")
+                            slot.mark_failed()
+                            permit.mark_failed()
+                            return "无法获取内容"
+                        except (aiohttp.ClientError, ValueError) as e:
+                            logging.error(f"获取页面内容失败 ({url}): {e}")
+                            return "无法获取内容"
+
+        text = await async_parse_page(loop, self._parse_executor, content, content_type, url)
+        if cache and text not in FAILURE_MESSAGES:
+            await loop.run_in_executor(
+                self._parse_executor, cache.put, url, text, etag, last_modified
+            )
+        return text
+
+    async def _read_body(self, response, url, worker):
+        """
+        流式读取响应体，超过config.MAX_PAGE_BYTES时截断，任务中断或超出时间预算时返回None。
+        """
+        max_bytes = config.MAX_PAGE_BYTES
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(config.DOWNLOAD_CHUNK_SIZE):
+            if http_client.should_stop(worker):
+                return None
+            chunks.append(chunk)
+            size += len(chunk)
+            if max_bytes and size >= max_bytes:
+                logging.warning(f"页面超过 {max_bytes} 字节，已截断：{url}")
+                break
+        body = b''.join(chunks)
+        return body[:max_bytes] if max_bytes else body
+
+    @property
+    def capacity(self):
+        """
+        可同时进行的抓取数量。
+        """
+        if config.ADAPTIVE_CONCURRENCY:
+            return min(get_concurrency_controller().capacity, self.max_concurrency)
+        return self.max_concurrency
+
+    def submit(self, url, worker=None):
+        """
+        提交一个页面抓取任务，返回concurrent.futures.Future。
+        """
+        return asyncio.run_coroutine_threadsafe(self._fetch(url, worker), self._loop)
+
+    async def _close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def shutdown(self):
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._parse_executor.shutdown(wait=False)
+
+
+class FetchToken:
+    """
+    单个页面抓取的停止信号，代替任务对象传给抓取引擎。
+    所属任务停止或本次抓取被取消后should_stop返回True；取消时关闭本次抓取正在使用的连接，
+    使已在线程池中执行、无法通过Future取消的下载也能立即结束并归还主机名额和并发名额。
+    """
+    def __init__(self, worker=None):
+        self.worker = worker
+        self.cancelled = False
+
+    @property
+    def is_running(self):
+        return not self.cancelled and (self.worker is None or self.worker.is_running)
+
+    @property
+    def deadline(self):
+        return getattr(self.worker, 'deadline', None)
+
+    @property
+    def use_cache(self):
+        return getattr(self.worker, 'use_cache', True)
+
+    def cancel(self):
+        self.cancelled = True
+        http_client.abort_in_flight(self)
+
+
+class FetchRegistry:
+    """
+    一次搜索内按规范化URL共享页面抓取：指向同一页面的多个结果只下载一次。
+    每个结果得到各自的Future，取消其中一个不影响其他结果；所有共享者都取消后才取消实际的下载，
+    正在进行的下载通过FetchToken中断。
+    """
+    def __init__(self, fetch_engine, worker=None):
+        self.fetch_engine = fetch_engine
+        self.worker = worker
+        # 规范化URL -> {'future': 实际下载的Future, 'token': 下载的停止信号, 'subscribers': 未取消的共享者数量}
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.shared = 0
+
+    def submit(self, url):
+        """
+        返回该URL页面内容的Future；同一页面已在下载或已下载完成时共用其结果。
+        """
+        key = canonical_key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['token'].cancelled:
+                entry = self._entries[key] = self._start(url)
+                self.submitted += 1
+            else:
+                self.shared += 1
+                logging.info(f"页面已在抓取，共用同一请求：{url}")
+            entry['subscribers'] += 1
+        return self._subscribe(entry)
+
+    def hedge(self, url):
+        """
+        为该URL发送一个不与其他结果共享的对冲请求，返回其Future；取消时中断该请求。
+        """
+        entry = self._start(url)
+        entry['subscribers'] = 1
+        return self._subscribe(entry)
+
+    def _start(self, url):
+        token = FetchToken(self.worker)
+        return {
+            'future': self.fetch_engine.submit(unwrap_link(url), token),
+            'token': token,
+            'subscribers': 0,
+        }
+
+    def _subscribe(self, entry):
+        """
+        返回转发实际下载结果的Future，调用方已为其增加共享者计数。
+        """
+        proxy = Future()
+
+        def forward(source):
+            try:
+                if source.cancelled():
+                    proxy.cancel()
+                elif source.exception() is not None:
+                    proxy.set_exception(source.exception())
+                else:
+                    proxy.set_result(source.result())
+            except InvalidStateError:
+                # 该结果已先行取消
+                pass
+
+        def unsubscribe(done):
+            if not done.cancelled():
+                return
+            with self._lock:
+                entry['subscribers'] -= 1
+                if entry['subscribers']:
+                    return
+            entry['future'].cancel()
+            entry['token'].cancel()
+
+        proxy.add_done_callback(unsubscribe)
+        entry['future'].add_done_callback(forward)
+        return proxy
+
+    def source(self, url):
+        """
+        返回该URL实际下载的Future，没有记录时返回None。
+        """
+        with self._lock:
+            entry = self._entries.get(canonical_key(url))
+        return entry['future'] if entry is not None else None
+
+
+_fetch_engine = None
+_fetch_engine_lock = threading.Lock()
+
+
+def get_fetch_engine():
+    """
+    获取进程内共享的页面抓取引擎，根据config.FETCH_BACKEND选择实现。
+    """
+    global _fetch_engine
+    with _fetch_engine_lock:
+        if _fetch_engine is None:
+            dns_cache.install()
+            backend = config.FETCH_BACKEND
+            if backend == 'async' and aiohttp is None:
+                logging.warning("未安装aiohttp，回退到线程池抓取引擎。")
+                backend = 'thread'
+            if backend == 'async':
+                _fetch_engine = AsyncFetchEngine()
+            else:
+                _fetch_engine = ThreadFetchEngine()
+            logging.info(f"页面抓取引擎已启动: {type(_fetch_engine).__name__}")
+            # 提前启动解析进程，避免首次搜索等待子进程导入解析库
+            get_parse_pool()
+    return _fetch_engine
+
+
+def shutdown_fetch_engine():
+    """
+    关闭共享的页面抓取引擎，程序退出时调用。
+    """
+    global _fetch_engine
+    with _fetch_engine_lock:
+        engine, _fetch_engine = _fetch_engine, None
+    if engine is not None:
+        engine.shutdown()
@@ -0,0 +1,75 @@
+# hedging.py
+import math
+import threading
+from collections import deque
+import config
+
+
+class HedgeTracker:
+    """
+    记录页面抓取耗时并统计对冲请求的效果。
+    对冲延迟取最近耗时样本的分位数，样本不足时使用默认值。
+    """
+    def __init__(self, window=None):
+        self._samples = deque(maxlen=window or config.HEDGE_WINDOW)
+        self._lock = threading.Lock()
+        self._counters = {
+            'hedged': 0,
+            'hedge_wins': 0,
+            'primary_wins': 0,
+            'saved_seconds': 0.0,
+        }
+
+    def record(self, seconds):
+        """
+        记录一次经网络成功下载页面的耗时（秒），由抓取引擎在读完响应后调用。
+        """
+        with self._lock:
+            self._samples.append(seconds)
+
+    def _quantile(self):
+        samples = sorted(self._samples)
+        if len(samples) < config.HEDGE_MIN_SAMPLES:
+            return None
+        index = min(math.ceil(config.HEDGE_QUANTILE * len(samples)) - 1, len(samples) - 1)
+        return samples[max(index, 0)]
+
+    def hedge_delay(self):
+        """
+        页面抓取超过该时间仍未完成时发送对冲请求。
+        """
+        with self._lock:
+            quantile = self._quantile()
+        if quantile is None:
+            return config.HEDGE_DEFAULT_DELAY
+        return max(quantile, config.HEDGE_MIN_DELAY)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def get_stats(self):
+        """
+        返回统计信息的副本：对冲次数、对冲请求先完成的次数、原请求先完成的次数、
+        对冲节省的时间（仅统计原请求最终完成的情况）以及当前对冲延迟。
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats['samples'] = len(self._samples)
+        stats['saved_seconds'] = round(stats['saved_seconds'], 3)
+        stats['hedge_delay'] = round(self.hedge_delay(), 3)
+        return stats
+
+
+_hedge_tracker = HedgeTracker()
+
+
+def get_hedge_tracker():
+    """
+    获取进程内共享的对冲统计。
+    """
+    return _hedge_tracker
+
+
+def get_stats():
+    return _hedge_tracker.get_stats()
@@ -0,0 +1,230 @@
+# host_scheduler.py
+import time
+import asyncio
+import logging
+import threading
+import urllib.parse
+import config
+import http_client
+
+# 等待连接名额或令牌时的轮询间隔（秒），期间检查任务是否被中断
+WAIT_INTERVAL = 0.05
+
+
+class HostUnavailable(Exception):
+    """
+    主机的熔断器处于打开状态，请求被直接拒绝。
+    """
+
+
+class TokenBucket:
+    """
+    令牌桶限速：每秒补充rate个令牌，最多积累burst个。
+    """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+    def take(self):
+        """
+        尝试取出一个令牌，成功返回0，否则返回需要等待的秒数。调用方负责加锁。
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class HostState:
+    """
+    单个主机的并发计数、限速和熔断状态。
+    """
+    def __init__(self, host):
+        self.active = 0
+        self.failures = 0
+        self.open_until = 0.0
+        rate_limit = config.HOST_RATE_LIMITS.get(host, config.HOST_DEFAULT_RATE_LIMIT)
+        self.bucket = TokenBucket(*rate_limit) if rate_limit else None
+
+
+def classify_outcome(exc, failures, worker, failed=False):
+    """
+    判断一次请求的结果：超时和连接失败为'failure'，中断为None，其余（包括HTTP状态码错误）为'success'。
+    中断或时间预算用完导致的失败不归咎于主机或网络。
+    """
+    if failed or isinstance(exc, failures):
+        return None if http_client.should_stop(worker) else 'failure'
+    if isinstance(exc, (http_client.FetchAborted, asyncio.CancelledError)):
+        return None
+    return 'success'
+
+
+class HostSlot:
+    """
+    已获得的主机请求名额，退出时根据异常类型更新熔断状态。
+    """
+    def __init__(self, scheduler, host, worker, failures):
+        self.scheduler = scheduler
+        self.host = host
+        self.worker = worker
+        self.failures = failures
+        self._failed = False
+
+    def mark_failed(self):
+        """
+        调用方自行处理了超时或连接失败时，用此方法计入熔断状态。
+        """
+        self._failed = True
+
+    def _release(self, exc):
+        outcome = classify_outcome(exc, self.failures, self.worker, self._failed)
+        self.scheduler.release(self.host, outcome)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._release(exc)
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._release(exc)
+        return False
+
+
+class HostScheduler:
+    """
+    按主机调度请求：限制每个主机的并发连接数，按令牌桶限速，
+    连续超时或连接失败达到阈值后熔断该主机一段时间，期间直接拒绝请求。
+    """
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'rate_limited_waits': 0,
+            'concurrency_waits': 0,
+            'fast_failed': 0,
+            'circuits_opened': 0,
+        }
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState(host)
+        return state
+
+    def _try_acquire(self, host, counted, rate_limited=True):
+        """
+        尝试获得名额，成功返回0，否则返回建议等待的秒数；熔断中抛出HostUnavailable。
+        counted记录本次请求已统计过的等待类型，避免轮询时重复计数。
+        rate_limited为False时不消耗令牌，只受并发数限制。
+        """
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+            if state.open_until > now:
+                self._stats['fast_failed'] += 1
+                raise HostUnavailable(f"主机 {host} 已熔断，{state.open_until - now:.0f} 秒后重试")
+            if state.active >= config.HOST_MAX_CONNECTIONS:
+                if 'concurrency' not in counted:
+                    counted.add('concurrency')
+                    self._stats['concurrency_waits'] += 1
+                return WAIT_INTERVAL
+            if rate_limited and state.bucket is not None:
+                wait = state.bucket.take()
+                if wait:
+                    if 'rate' not in counted:
+                        counted.add('rate')
+                        self._stats['rate_limited_waits'] += 1
+                    return wait
+            state.active += 1
+            return 0.0
+
+    def slot(self, url, worker=None, failures=(), rate_limited=True):
+        """
+        阻塞等待目标主机的请求名额，返回上下文管理器。
+        failures为计入熔断的异常类型；任务中断或超出时间预算时抛出FetchAborted。
+        rate_limited为False时不受令牌桶限速，用于解析跳转链接等不请求搜索结果页面的轻量请求。
+        """
+        host = _host(url)
+        counted = set()
+        while True:
+            wait = self._try_acquire(host, counted, rate_limited)
+            if not wait:
+                return HostSlot(self, host, worker, failures)
+            if http_client.should_stop(worker):
+                raise http_client.FetchAborted(f"等待主机 {host} 时任务被中断")
+            time.sleep(min(wait, WAIT_INTERVAL))
+
+    async def async_slot(self, url, worker=None, failures=(), rate_limited=True):
+        """
+        slot的异步版本，等待期间不阻塞事件循环，返回异步上下文管理器。
+        """
+        host = _host(url)
+        counted = set()
+        while True:
+            wait = self._try_acquire(host, counted, rate_limited)
+            if not wait:
+                return HostSlot(self, host, worker, failures)
+            if http_client.should_stop(worker):
+                raise http_client.FetchAborted(f"等待主机 {host} 时任务被中断")
+            await asyncio.sleep(min(wait, WAIT_INTERVAL))
+
+    def release(self, host, outcome):
+        """
+        归还名额。outcome为'success'时重置失败计数，为'failure'时累计并在达到阈值后熔断，
+        为None时不影响熔断状态。
+        """
+        with self._lock:
+            state = self._state(host)
+            state.active -= 1
+            if outcome == 'success':
+                state.failures = 0
+            elif outcome == 'failure':
+                state.failures += 1
+                # 冷却结束后的试探请求再次失败时立即重新熔断
+                if state.failures >= config.CIRCUIT_FAILURE_THRESHOLD:
+                    state.open_until = time.monotonic() + config.CIRCUIT_COOLDOWN
+                    self._stats['circuits_opened'] += 1
+                    logging.warning(
+                        f"主机 {host} 连续 {state.failures} 次超时或连接失败，"
+                        f"熔断 {config.CIRCUIT_COOLDOWN} 秒。"
+                    )
+
+    def get_stats(self):
+        """
+        返回调度统计的副本，包含当前处于熔断状态的主机。
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            now = time.monotonic()
+            stats['open_circuits'] = [
+                host for host, state in self._hosts.items() if state.open_until > now
+            ]
+        return stats
+
+
+def _host(url):
+    return (urllib.parse.urlsplit(url).hostname or '').lower()
+
+
+_host_scheduler = HostScheduler()
+
+
+def get_host_scheduler():
+    """
+    获取进程内共享的主机调度器。
+    """
+    return _host_scheduler
+
+
+def get_stats():
+    return _host_scheduler.get_stats()
@@ -0,0 +1,84 @@
+# html_minimizer.py
+import re
+import time
+import threading
+
+# 连同内容一起删除的元素，正文提取时都会被忽略
+STRIP_TAGS = ('script', 'style', 'svg', 'noscript', 'template')
+
+# 标签名后必须是空白、'/'或'>'，避免误匹配<svg-icon>等自定义元素
+_OPEN_RE = re.compile(r'<!--|<(' + '|'.join(STRIP_TAGS) + r')(?=[\s/>])', re.I)
+_CLOSE_RES = {tag: re.compile(rf'</{tag}\s*>', re.I) for tag in STRIP_TAGS}
+
+# 可以用'/>'自闭合的元素；HTML中只有SVG等外部元素支持自闭合，<script/>仍会延续到结束标签
+SELF_CLOSING_TAGS = {'svg'}
+
+# 累计的处理页面数、字符数和耗时
+_stats = {
+    'pages': 0,
+    'input_chars': 0,
+    'output_chars': 0,
+    'seconds': 0.0,
+}
+_stats_lock = threading.Lock()
+
+
+def get_stats():
+    """
+    返回精简阶段累计统计的副本，包含删除比例。
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['removed_ratio'] = (
+        1 - stats['output_chars'] / stats['input_chars'] if stats['input_chars'] else 0.0
+    )
+    return stats
+
+
+def add_stats(counts):
+    """
+    累加在其他进程中统计的处理量。
+    """
+    with _stats_lock:
+        for name, value in counts.items():
+            if name in _stats:
+                _stats[name] += value
+
+
+def minimize_html(text):
+    """
+    在建树之前删除脚本、样式、SVG等元素及HTML注释。
+    只按顺序向前扫描一遍；自闭合的<svg/>和找不到结束标签的元素只删除其开始标签，保留其后的内容。
+    """
+    started = time.perf_counter()
+    parts = []
+    position = 0
+    length = len(text)
+    while position < length:
+        match = _OPEN_RE.search(text, position)
+        if not match:
+            parts.append(text[position:])
+            break
+        parts.append(text[position:match.start()])
+        tag = match.group(1)
+        if tag is None:
+            end = text.find('-->', match.end())
+            position = end + 3 if end >= 0 else length
+            continue
+        end = text.find('>', match.end())
+        if end < 0:
+            position = length
+            continue
+        if tag.lower() in SELF_CLOSING_TAGS and text[end - 1] == '/':
+            position = end + 1
+            continue
+        close = _CLOSE_RES[tag.lower()].search(text, end + 1)
+        position = close.end() if close else end + 1
+    result = ''.join(parts)
+
+    with _stats_lock:
+        _stats['pages'] += 1
+        _stats['input_chars'] += length
+        _stats['output_chars'] += len(result)
+        _stats['seconds'] += time.perf_counter() - started
+    return result
@@ -0,0 +1,153 @@
+# html_parser.py
+import logging
+import threading
+from bs4 import BeautifulSoup, NavigableString, SoupStrainer, Tag
+import config
+
+try:
+    import lxml  # noqa: F401  仅用于检测是否安装
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    except ImportError:
+        SelectolaxParser = None
+
+# 自动选择时的优先顺序，越靠前解析越快
+BACKEND_PRIORITY = ('selectolax', 'lxml', 'html.parser')
+
+
+class SoupNode:
+    """
+    BeautifulSoup节点的统一封装，用于html.parser和lxml后端。
+    """
+    __slots__ = ('_element',)
+
+    def __init__(self, element):
+        self._element = element
+
+    @property
+    def tag(self):
+        return self._element.name
+
+    def css(self, selector):
+        return [SoupNode(element) for element in self._element.select(selector)]
+
+    def css_first(self, selector):
+        element = self._element.select_one(selector)
+        return SoupNode(element) if element is not None else None
+
+    def text(self, separator=' ', strip=True):
+        return self._element.get_text(separator=separator, strip=strip)
+
+    def attr(self, name):
+        value = self._element.get(name)
+        # class等多值属性在BeautifulSoup中是列表
+        if isinstance(value, list):
+            return ' '.join(value)
+        return value
+
+    def children(self):
+        """
+        依次产出子元素节点和文本字符串，跳过注释、文档类型等。
+        """
+        for child in self._element.children:
+            if isinstance(child, Tag):
+                yield SoupNode(child)
+            elif type(child) is NavigableString:
+                yield str(child)
+
+
+class SelectolaxNode:
+    """
+    selectolax节点的统一封装。
+    """
+    __slots__ = ('_node',)
+
+    def __init__(self, node):
+        self._node = node
+
+    @property
+    def tag(self):
+        return self._node.tag
+
+    def css(self, selector):
+        return [SelectolaxNode(node) for node in self._node.css(selector)]
+
+    def css_first(self, selector):
+        node = self._node.css_first(selector)
+        return SelectolaxNode(node) if node is not None else None
+
+    def text(self, separator=' ', strip=True):
+        return self._node.text(separator=separator, strip=strip)
+
+    def attr(self, name):
+        return self._node.attributes.get(name)
+
+    def children(self):
+        """
+        依次产出子元素节点和文本字符串，跳过注释、文档类型等。
+        """
+        for child in self._node.iter(include_text=True):
+            tag = child.tag
+            if tag == '-text':
+                yield child.text(deep=False)
+            elif not tag.startswith(('-', '_', '!')):
+                yield SelectolaxNode(child)
+
+
+def available_backends():
+    """
+    返回当前环境中已安装的解析后端，按速度从快到慢排列。
+    """
+    installed = {
+        'selectolax': SelectolaxParser is not None,
+        'lxml': lxml is not None,
+        'html.parser': True,
+    }
+    return [backend for backend in BACKEND_PRIORITY if installed[backend]]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    确定使用的解析后端：config.HTML_PARSER为'auto'时选择已安装的最快后端，
+    指定的后端不可用时回退到自动选择。
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            backends = available_backends()
+            requested = config.HTML_PARSER
+            if requested != 'auto' and requested not in backends:
+                logging.warning(f"HTML解析后端 {requested} 不可用，将自动选择。")
+                requested = 'auto'
+            _backend = backends[0] if requested == 'auto' else requested
+            logging.info(f"HTML解析后端: {_backend}")
+    return _backend
+
+
+def parse_html(markup, backend=None, parse_only=None):
+    """
+    使用选定的后端解析HTML，返回可用CSS选择器查询的文档节点。
+    parse_only为 (标签名, class) 时，BeautifulSoup后端只为匹配的元素及其子树建树；
+    selectolax整页解析已足够快，忽略该参数。
+    """
+    backend = backend or get_backend()
+    if backend == 'selectolax':
+        return SelectolaxNode(SelectolaxParser(markup))
+    strainer = None
+    if parse_only:
+        tag, class_name = parse_only
+        # 解析阶段class为原始字符串，需按空白拆分后逐个比较
+        strainer = SoupStrainer(
+            tag, class_=lambda value: bool(value) and class_name in value.split()
+        )
+    return SoupNode(BeautifulSoup(markup, backend, parse_only=strainer))
@@ -0,0 +1,291 @@
+# http_client.py
+import socket
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+import config
+import dns_cache
+
+_session = None
+_session_lock = threading.Lock()
+
+# 计入主机熔断状态的请求异常：超时和连接失败
+HOST_FAILURES = (requests.Timeout, requests.ConnectionError)
+
+# 各任务正在读取响应体的请求，中断时据此关闭连接
+_in_flight = {}
+# 各任务尚未收到响应头的连接
+_pending_connections = {}
+_in_flight_lock = threading.Lock()
+
+# 当前线程发出的请求所属的任务和重试策略，供连接池使用
+_local = threading.local()
+
+
+class FetchAborted(Exception):
+    """
+    下载过程中任务被中断或时间预算已用完。
+    """
+
+
+def should_stop(worker):
+    """
+    任务被中断或超出时间预算时返回True。
+    """
+    if worker is None:
+        return False
+    if not worker.is_running:
+        return True
+    deadline = getattr(worker, 'deadline', None)
+    return deadline is not None and deadline.expired()
+
+
+def _create_retry():
+    """
+    页面抓取的重试策略：对连接错误和临时性状态码按指数退避重试。
+    读取超时不重试，交给对冲请求处理，避免一个无响应的主机占用数倍的超时时间。
+    不遵循Retry-After，避免服务器要求的长时间等待拖慢整次搜索。
+    """
+    return Retry(
+        total=config.HTTP_RETRIES,
+        read=False,
+        backoff_factor=config.HTTP_RETRY_BACKOFF,
+        status_forcelist=config.HTTP_RETRY_STATUSES,
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+
+
+def retry_delay(attempt):
+    """
+    第attempt次重试（从1开始）前的等待时间，与urllib3的退避算法一致：第一次立即重试。
+    """
+    if attempt <= 1:
+        return 0.0
+    return config.HTTP_RETRY_BACKOFF * (2 ** (attempt - 1))
+
+
+class _TrackedPoolMixin:
+    """
+    取出连接时登记到当前请求所属的任务，使等待响应头的请求也能在中断时被关闭；
+    任务已停止时拒绝取出连接，urllib3的重试随之结束。
+    只有以retry=True发出的请求才使用重试策略，其余请求沿用Session默认的不重试。
+    """
+    def urlopen(self, method, url, *args, **kwargs):
+        # urllib3重试时会递归调用urlopen并传入剩余的重试次数，只在最外层调用设置重试策略
+        if getattr(_local, 'in_urlopen', False):
+            return super().urlopen(method, url, *args, **kwargs)
+        retries = getattr(_local, 'retries', None)
+        if retries is not None:
+            kwargs['retries'] = retries
+        _local.in_urlopen = True
+        try:
+            return super().urlopen(method, url, *args, **kwargs)
+        finally:
+            _local.in_urlopen = False
+
+    def _get_conn(self, timeout=None):
+        worker = getattr(_local, 'worker', None)
+        conn = super()._get_conn(timeout)
+        # 先登记再检查，避免检查之后到登记之前发生的中断关闭不到本连接
+        if worker is not None:
+            with _in_flight_lock:
+                _pending_connections.setdefault(id(worker), set()).add(conn)
+            _local.connections.append(conn)
+        if should_stop(worker):
+            # urlopen出错时会把一个空位放回连接池，这里关闭取出的连接即可
+            conn.close()
+            raise FetchAborted(f"请求被中断：{self.host}")
+        return conn
+
+
+class _TrackedHTTPConnectionPool(_TrackedPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _TrackedHTTPSConnectionPool(_TrackedPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class _TrackedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TrackedHTTPConnectionPool,
+            'https': _TrackedHTTPSConnectionPool,
+        }
+
+
+def _create_session(pool_connections, pool_maxsize):
+    """
+    创建带连接池和默认请求头的Session；默认不重试，页面抓取通过get(retry=True)启用重试。
+    """
+    dns_cache.install()
+    session = requests.Session()
+    session.headers.update(config.DEFAULT_HEADERS)
+    adapter = _TrackedAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    logging.info(
+        f"已创建共享HTTP会话，连接池主机数: {pool_connections}，每主机最大连接数: {pool_maxsize}"
+    )
+    return session
+
+
+def get_session():
+    """
+    获取进程内共享的Session，所有搜索引擎和页面抓取都通过它复用连接。
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session(config.HTTP_POOL_CONNECTIONS, config.HTTP_POOL_MAXSIZE)
+    return _session
+
+
+def get(url, timeout=None, worker=None, retry=False, **kwargs):
+    """
+    通过共享Session发送GET请求。
+    retry为True时按_create_retry的策略重试，只用于页面抓取；搜索引擎请求不重试，
+    避免在一个主机调度槽位内绕过令牌桶重复请求。
+    指定worker时，等待响应头期间的连接会登记到该任务，中断时由abort_in_flight关闭。
+    """
+    if timeout is None:
+        timeout = config.REQUEST_TIMEOUT
+    _local.worker = worker
+    _local.retries = _create_retry() if retry else None
+    _local.connections = []
+    try:
+        return get_session().get(url, timeout=timeout, **kwargs)
+    finally:
+        if worker is not None:
+            # 收到响应头后由read_body登记响应，这里注销本次请求用过的连接
+            with _in_flight_lock:
+                connections = _pending_connections.get(id(worker))
+                if connections is not None:
+                    connections.difference_update(_local.connections)
+                    if not connections:
+                        del _pending_connections[id(worker)]
+        _local.worker = None
+        _local.retries = None
+        _local.connections = []
+
+
+def head(url, timeout=None, **kwargs):
+    """
+    通过共享Session发送HEAD请求。
+    """
+    if timeout is None:
+        timeout = config.REQUEST_TIMEOUT
+    return get_session().head(url, timeout=timeout, **kwargs)
+
+
+def read_body(response, max_bytes=None, worker=None, on_chunk=None):
+    """
+    以流式方式读取响应体（需以stream=True发送请求）。
+    超过max_bytes时停止读取并截断，worker停止或超出时间预算时立即中断并抛出FetchAborted。
+    on_chunk在每收到一块数据时调用，返回True时提前结束下载。
+    """
+    if max_bytes is None:
+        max_bytes = config.MAX_PAGE_BYTES
+    chunks = []
+    size = 0
+    _register(worker, response)
+    try:
+        # 注册前任务可能已被中断，此时abort_in_flight不会关闭本连接
+        if should_stop(worker):
+            raise FetchAborted(f"下载被中断：{response.url}")
+        for chunk in response.iter_content(chunk_size=config.DOWNLOAD_CHUNK_SIZE):
+            if should_stop(worker):
+                raise FetchAborted(f"下载被中断：{response.url}")
+            chunks.append(chunk)
+            size += len(chunk)
+            if on_chunk is not None and on_chunk(chunk):
+                logging.info(f"已提取到足够的正文，提前结束下载（{size} 字节）：{response.url}")
+                break
+            if max_bytes and size >= max_bytes:
+                logging.warning(f"页面超过 {max_bytes} 字节，已截断：{response.url}")
+                break
+    except Exception:
+        # 连接被abort_in_flight关闭时按中断处理
+        if should_stop(worker):
+            raise FetchAborted(f"下载被中断：{response.url}")
+        raise
+    finally:
+        _unregister(worker, response)
+    # 连接被关闭也可能表现为响应体提前结束，不能把不完整的内容当作结果
+    if should_stop(worker):
+        raise FetchAborted(f"下载被中断：{response.url}")
+    body = b''.join(chunks)
+    return body[:max_bytes] if max_bytes else body
+
+
+def _register(worker, response):
+    if worker is None:
+        return
+    with _in_flight_lock:
+        _in_flight.setdefault(id(worker), set()).add(response)
+
+
+def _unregister(worker, response):
+    if worker is None:
+        return
+    with _in_flight_lock:
+        responses = _in_flight.get(id(worker))
+        if responses is not None:
+            responses.discard(response)
+            if not responses:
+                del _in_flight[id(worker)]
+
+
+def abort_in_flight(worker):
+    """
+    关闭指定任务所有正在下载或等待响应头的连接。
+    对底层socket执行shutdown，使阻塞在读取上的线程立即返回，由读取线程自行释放响应。
+    返回被关闭的连接数。
+    """
+    with _in_flight_lock:
+        responses = _in_flight.pop(id(worker), set())
+        connections = _pending_connections.pop(id(worker), set())
+    for conn in connections:
+        sock = getattr(conn, 'sock', None)
+        if sock is None:
+            continue
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    if connections:
+        logging.info(f"已关闭 {len(connections)} 个等待响应的连接。")
+    for response in responses:
+        try:
+            # 复制文件描述符后shutdown，作用于同一连接，且不影响读取线程持有的socket对象
+            sock = socket.fromfd(response.raw.fileno(), socket.AF_INET, socket.SOCK_STREAM)
+        except (OSError, ValueError) as e:
+            logging.debug(f"无法获取连接的socket：{e}")
+            continue
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        finally:
+            sock.close()
+    if responses:
+        logging.info(f"已关闭 {len(responses)} 个进行中的下载连接。")
+    return len(responses)
+
+
+def close():
+    """
+    关闭共享Session，释放所有连接。
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -1,19 +1,25 @@
 # main.py
 import sys
 import logging
-from PyQt5.QtWidgets import QApplication
-from search_app import SearchApp
+import multiprocessing
 
 def main():
     """
     程序主入口。
     """
+    # 解析进程池以spawn方式启动子进程，子进程会重新导入本模块；
+    # 界面相关的导入放在这里，避免每个子进程都加载PyQt5和整个搜索模块
+    from PyQt5.QtWidgets import QApplication
+    from search_app import SearchApp
+
     app = QApplication(sys.argv)
     window = SearchApp()
     window.show()
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    # 打包为可执行文件时，解析进程池的子进程需要在此处返回
+    multiprocessing.freeze_support()
     # 配置日志
     logging.basicConfig(
         filename='search_app.log',
@@ -0,0 +1,136 @@
+# page_cache.py
+import os
+import time
+import sqlite3
+import logging
+import threading
+import urllib.parse
+import config
+
+
+def normalize_url(url):
+    """
+    规范化URL作为缓存键：小写协议和主机名，去除默认端口和片段，查询参数排序。
+    """
+    parsed = urllib.parse.urlsplit(url.strip())
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme == 'http' and netloc.endswith(':80')) or (scheme == 'https' and netloc.endswith(':443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)))
+    return urllib.parse.urlunsplit((scheme, netloc, parsed.path or '/', query, ''))
+
+
+class PageCache:
+    """
+    基于SQLite的页面正文缓存。
+    以规范化URL为键保存提取后的文本以及ETag/Last-Modified，
+    TTL内直接命中，过期后通过条件请求重新验证。
+    """
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, content TEXT NOT NULL, etag TEXT, "
+                "last_modified TEXT, fetched_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        self.purge(config.PAGE_CACHE_MAX_AGE)
+
+    def get(self, url):
+        """
+        返回缓存条目字典，不存在时返回None。
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, etag, last_modified, fetched_at FROM pages WHERE url = ?",
+                (normalize_url(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'content': row[0],
+            'etag': row[1],
+            'last_modified': row[2],
+            'fetched_at': row[3],
+        }
+
+    def is_fresh(self, entry):
+        return time.time() - entry['fetched_at'] < self.ttl
+
+    def conditional_headers(self, entry):
+        """
+        根据缓存条目生成条件请求头。
+        """
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url, content, etag=None, last_modified=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, content, etag, last_modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (normalize_url(url), content, etag, last_modified, time.time())
+            )
+            self._conn.commit()
+
+    def touch(self, url):
+        """
+        条件请求返回304时刷新条目的获取时间。
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ? WHERE url = ?",
+                (time.time(), normalize_url(url))
+            )
+            self._conn.commit()
+
+    def purge(self, max_age):
+        """
+        删除超过max_age秒未刷新的条目。
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM pages WHERE fetched_at < ?", (time.time() - max_age,)
+            )
+            self._conn.commit()
+        if cursor.rowcount:
+            logging.info(f"已清理 {cursor.rowcount} 条过期页面缓存。")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    """
+    获取进程内共享的页面缓存，未启用或无法打开时返回None。
+    """
+    global _page_cache
+    if not config.PAGE_CACHE_ENABLED:
+        return None
+    with _page_cache_lock:
+        if _page_cache is None:
+            path = os.path.join(config.CACHE_DIR, 'page_cache.sqlite3')
+            try:
+                _page_cache = PageCache(path, config.PAGE_CACHE_TTL)
+                logging.info(f"已打开页面缓存: {path}")
+            except (sqlite3.Error, OSError) as e:
+                logging.error(f"打开页面缓存失败，将不使用缓存：{e}")
+                config.PAGE_CACHE_ENABLED = False
+                return None
+    return _page_cache
@@ -0,0 +1,111 @@
+# parse_pool.py
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import config
+import encoding
+import html_minimizer
+import utils
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def _stats_delta(before, after):
+    return {name: after[name] - before[name] for name in before if after[name] != before[name]}
+
+
+def _parse_task(content, content_type, url):
+    """
+    在子进程中解码并提取正文，同时返回本次处理产生的统计增量，由主进程累加。
+    """
+    encoding_before = encoding.get_stats()
+    minimizer_before = html_minimizer.get_stats()
+    text = utils.parse_page_content(content, content_type, url)
+    return (
+        text,
+        _stats_delta(encoding_before, encoding.get_stats()),
+        _stats_delta(minimizer_before, html_minimizer.get_stats()),
+    )
+
+
+def _warm_up():
+    """
+    预先导入解析后端并解析一个小页面，使首次搜索不必等待子进程启动。
+    """
+    utils.parse_page_content(b'<html><body><p>warm up</p></body></html>', 'text/html', 'about:blank')
+    return os.getpid()
+
+
+def _process_count():
+    return config.PARSE_PROCESSES or os.cpu_count() or 1
+
+
+def get_parse_pool():
+    """
+    获取进程内共享的解析进程池，在多次搜索之间保持子进程常驻。
+    未启用进程池解析时返回None。
+    """
+    global _parse_pool
+    if not config.PARSE_IN_PROCESSES:
+        return None
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            processes = _process_count()
+            # 使用spawn启动子进程，避免在已有多个线程的进程中fork
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context('spawn')
+            )
+            for _ in range(processes):
+                _parse_pool.submit(_warm_up)
+            logging.info(f"解析进程池已启动，进程数: {processes}")
+    return _parse_pool
+
+
+def _reset_parse_pool(pool):
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is pool:
+            _parse_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _merge(result):
+    text, encoding_stats, minimizer_stats = result
+    encoding.add_stats(encoding_stats)
+    html_minimizer.add_stats(minimizer_stats)
+    return text
+
+
+def parse_page(content, content_type, url):
+    """
+    在解析进程池中解码页面并提取正文，阻塞等待结果；未启用进程池时在当前线程中处理。
+    子进程异常退出时重建进程池，本次改为在当前线程中处理。
+    """
+    pool = get_parse_pool()
+    if pool is None:
+        return utils.parse_page_content(content, content_type, url)
+    try:
+        return _merge(pool.submit(_parse_task, content, content_type, url).result())
+    except BrokenProcessPool as e:
+        logging.error(f"解析进程池异常，已重建 ({url}): {e}")
+        _reset_parse_pool(pool)
+        return utils.parse_page_content(content, content_type, url)
+
+
+async def async_parse_page(loop, executor, content, content_type, url):
+    """
+    parse_page的异步版本；未启用进程池时在executor线程中处理。
+    """
+    pool = get_parse_pool()
+    if pool is None:
+        return await loop.run_in_executor(executor, utils.parse_page_content, content, content_type, url)
+    try:
+        return _merge(await loop.run_in_executor(pool, _parse_task, content, content_type, url))
+    except BrokenProcessPool as e:
+        logging.error(f"解析进程池异常，已重建 ({url}): {e}")
+        _reset_parse_pool(pool)
+        return await loop.run_in_executor(executor, utils.parse_page_content, content, content_type, url)
@@ -0,0 +1,285 @@
+# pipeline.py
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import config
+from fetch_engine import get_fetch_engine, FetchRegistry
+from hedging import get_hedge_tracker
+from utils import FAILURE_MESSAGES
+from search_engines import SEARCH_FUNCTIONS, ALL_ENGINES, search
+
+# 等待任务完成时检查中断状态的间隔（秒）
+POLL_INTERVAL = 0.2
+
+INTERRUPTED_CONTENT = "任务已中断，无法获取内容"
+
+
+class SearchPipeline:
+    """
+    搜索流水线。
+    所有关键词的搜索结果页请求和页面抓取共用一组有界的线程池并发执行，
+    某个关键词的搜索结果页一返回就开始抓取其页面，结果仍按关键词顺序返回。
+    不同关键词的结果指向同一页面时只下载一次。
+    页面长时间未完成时发送对冲请求，取先完成者。
+    """
+    def __init__(self, engine, num_results=5, worker=None, on_result=None, on_content=None,
+                 use_cache=True, deadline=None, overfetch=False):
+        if engine != ALL_ENGINES and engine not in SEARCH_FUNCTIONS:
+            raise Exception("不支持的搜索引擎。")
+        self.engine = engine
+        self.num_results = num_results
+        self.worker = worker
+        self.use_cache = use_cache
+        # 整次搜索的时间预算，None表示不限制
+        self.deadline = deadline
+        # 超量抓取模式：多请求一些结果，每个关键词凑够num_results个有效页面即结束
+        self.overfetch = overfetch
+        self.fetch_count = num_results * config.OVERFETCH_FACTOR if overfetch else num_results
+        # 解析出单条搜索结果时的回调
+        self.on_result = on_result
+        # 单条结果的页面内容获取完成时的回调
+        self.on_content = on_content
+        self._tracker = get_hedge_tracker()
+
+    def is_running(self):
+        return self.worker is None or self.worker.is_running
+
+    def deadline_expired(self):
+        return self.deadline is not None and self.deadline.expired()
+
+    def _unfinished_content(self, result):
+        # 超出时间预算时用摘要代替正文，用户中断时标记为已中断
+        if self.deadline_expired() and self.is_running():
+            return result['snippet']
+        return INTERRUPTED_CONTENT
+
+    def _is_usable(self, result):
+        content = result['content']
+        return content not in FAILURE_MESSAGES and len(content) >= config.USABLE_CONTENT_MIN_LENGTH
+
+    def _collect_usable(self, result):
+        """
+        超量抓取模式下登记一个内容已确定的结果。
+        有效页面才通知界面；某关键词凑够有效页面后取消其余请求。
+        """
+        if not self._is_usable(result):
+            return
+        index = result['query_index']
+        usable = self._usable[index]
+        if len(usable) >= self.num_results:
+            return
+        usable.append(result)
+        self._notify(self.on_result, result)
+        self._notify(self.on_content, result)
+        if len(usable) < self.num_results:
+            return
+        cancelled = 0
+        for future, (kind, payload) in list(self._pending.items()):
+            if kind == 'page' and payload['query_index'] == index:
+                self._pending.pop(future)
+                future.cancel()
+                self._finished.add(id(payload))
+                cancelled += 1
+        logging.info(f"关键词 {result['query']} 已获得 {len(usable)} 个有效页面，取消其余 {cancelled} 个请求。")
+
+    def _select_results(self, results, index):
+        """
+        超量抓取模式下每个关键词的最终结果：有效页面按排名排列，不足时用其余结果按排名补齐。
+        """
+        selected = sorted(self._usable[index], key=lambda result: result['rank'])
+        if len(selected) < self.num_results:
+            chosen = {id(result) for result in selected}
+            rest = [result for result in results if id(result) not in chosen]
+            selected = sorted(selected + rest[:self.num_results - len(selected)],
+                              key=lambda result: result['rank'])
+        return selected
+
+    def _notify(self, callback, result):
+        if callback is not None:
+            try:
+                callback(result)
+            except Exception as e:
+                logging.error(f"搜索流水线回调出错：{e}")
+
+    def _submit_page(self, result, hedge=False):
+        """
+        提交一个页面抓取请求，同一结果的原请求和对冲请求都记录在_attempts中。
+        原请求通过_fetches与指向同一页面的其他结果共享；对冲请求总是重新发送。
+        """
+        if hedge:
+            future = self._fetches.hedge(result['link'])
+        else:
+            future = self._fetches.submit(result['link'])
+        self._pending[future] = ('page', result)
+        self._attempts.setdefault(id(result), []).append((future, time.monotonic()))
+        return future
+
+    def _launch_hedges(self, fetch_engine):
+        """
+        对耗时超过对冲延迟仍未完成的页面再发送一个相同请求，每个结果最多对冲一次。
+        抓取引擎已满负荷时不对冲，避免对冲请求排在其他页面之后。
+        """
+        in_flight = sum(1 for kind, _ in self._pending.values() if kind == 'page')
+        if in_flight >= fetch_engine.capacity:
+            return
+        delay = self._tracker.hedge_delay()
+        now = time.monotonic()
+        for future, (kind, result) in list(self._pending.items()):
+            if kind != 'page' or id(result) in self._hedged:
+                continue
+            attempts = self._attempts[id(result)]
+            if attempts[0][0] is not future or now - attempts[0][1] < delay:
+                continue
+            logging.info(f"页面超过 {delay:.2f} 秒未完成，发送对冲请求：{result['link']}")
+            self._hedged.add(id(result))
+            self._tracker.count('hedged')
+            self._submit_page(result, hedge=True)
+            in_flight += 1
+            if in_flight >= fetch_engine.capacity:
+                break
+
+    def _finish_page(self, future, result):
+        """
+        处理完成的页面请求，返回True表示该结果已确定内容。
+        原请求和对冲请求中先成功完成者胜出，另一个被取消；先完成的请求失败时继续等待另一个。
+        """
+        if id(result) in self._finished:
+            return False
+        try:
+            content = future.result()
+        except Exception as e:
+            logging.error(f"抓取内容时出错 ({result['link']}): {e}")
+            content = "无法获取内容"
+
+        attempts = self._attempts[id(result)]
+        others = [(other, started) for other, started in attempts
+                  if other is not future and other in self._pending]
+        if content in FAILURE_MESSAGES and others:
+            return False
+
+        self._finished.add(id(result))
+        now = time.monotonic()
+        primary, primary_started = attempts[0]
+        # 原请求是共享下载的代理Future，取消后不会再完成，节省的时间按实际的下载计算
+        primary_source = self._fetches.source(result['link'])
+        for other, _ in others:
+            self._pending.pop(other, None)
+            other.cancel()
+        # 页面耗时由抓取引擎在网络请求完成时记录，这里只统计对冲的结果
+        if id(result) in self._hedged and future is primary:
+            self._tracker.count('primary_wins')
+        elif id(result) in self._hedged:
+            self._tracker.count('hedge_wins')
+            elapsed = now - primary_started
+
+            # 原请求与其他结果共享而继续下载时，其最终耗时与对冲结果的差值即为节省的时间；被中断的不计
+            def record_saving(primary_future):
+                if (not primary_future.cancelled() and primary_future.exception() is None
+                        and primary_future.result() not in FAILURE_MESSAGES):
+                    self._tracker.count('saved_seconds', time.monotonic() - primary_started - elapsed)
+            if primary_source is not None:
+                primary_source.add_done_callback(record_saving)
+
+        result['content'] = content
+        if content == INTERRUPTED_CONTENT:
+            result['content'] = self._unfinished_content(result)
+        return True
+
+    def run(self, queries):
+        """
+        执行所有关键词的搜索，返回与queries一一对应的结果列表。
+        中断后在一个检查间隔内返回，已取得的结果保留，未获取到内容的结果标记为已中断。
+        超出时间预算时立即返回，未获取到内容的结果使用摘要代替。
+        """
+        results_by_query = [[] for _ in queries]
+        if not queries:
+            return results_by_query
+
+        fetch_engine = get_fetch_engine()
+        serp_executor = ThreadPoolExecutor(
+            max_workers=min(len(queries), config.SERP_MAX_WORKERS),
+            thread_name_prefix='serp'
+        )
+        # future -> ('serp', 关键词序号) 或 ('page', 结果字典)
+        self._pending = pending = {}
+        # id(结果字典) -> [(future, 提交时间)]，第一个为原请求
+        self._attempts = {}
+        self._hedged = set()
+        self._finished = set()
+        # 不同关键词的结果指向同一页面时只下载一次
+        self._fetches = FetchRegistry(fetch_engine, self.worker)
+        # 超量抓取模式下各关键词已获得的有效页面
+        self._usable = [[] for _ in queries]
+        first_error = None
+        try:
+            for index, query in enumerate(queries):
+                future = serp_executor.submit(
+                    search, self.engine, query, self.fetch_count, self.use_cache, self.deadline
+                )
+                pending[future] = ('serp', index)
+
+            while pending:
+                if not self.is_running():
+                    logging.info("搜索流水线被中断。")
+                    break
+                if self.deadline_expired():
+                    logging.info(f"搜索时间预算 {self.deadline.seconds} 秒已用完，返回已取得的结果。")
+                    break
+                timeout = POLL_INTERVAL
+                if self.deadline is not None:
+                    timeout = min(timeout, self.deadline.remaining())
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future not in pending:
+                        # 对冲请求的另一方已胜出并将其移除
+                        continue
+                    kind, payload = pending.pop(future)
+                    if kind == 'serp':
+                        query = queries[payload]
+                        try:
+                            results = future.result()
+                        except Exception as e:
+                            logging.error(f"关键词 {query} 搜索失败：{e}")
+                            if first_error is None:
+                                first_error = e
+                            continue
+                        for rank, result in enumerate(results):
+                            result['query'] = query
+                            # 关键词序号和排名用于在界面中保持结果顺序
+                            result['query_index'] = payload
+                            result['rank'] = rank
+                            if not self.overfetch:
+                                self._notify(self.on_result, result)
+                        results_by_query[payload] = results
+                        for result in results:
+                            if not self.is_running():
+                                break
+                            self._submit_page(result)
+                    elif self._finish_page(future, payload):
+                        if self.overfetch:
+                            self._collect_usable(payload)
+                        else:
+                            self._notify(self.on_content, payload)
+                if config.HEDGE_ENABLED and self.is_running():
+                    self._launch_hedges(fetch_engine)
+        finally:
+            # 中断或出错时取消未完成的任务，正在执行的下载由FetchToken中断，不等待其结束
+            for future, (kind, payload) in pending.items():
+                future.cancel()
+                if kind == 'page' and id(payload) not in self._finished:
+                    payload['content'] = self._unfinished_content(payload)
+            serp_executor.shutdown(wait=False, cancel_futures=True)
+        if self._fetches.shared:
+            logging.info(
+                f"共发送 {self._fetches.submitted} 个页面请求，{self._fetches.shared} 个结果共用了已有的请求。"
+            )
+
+        if self.overfetch:
+            results_by_query = [
+                self._select_results(results, index) for index, results in enumerate(results_by_query)
+            ]
+
+        # 所有关键词都失败时，将错误交给调用方处理
+        if first_error is not None and not any(results_by_query):
+            raise first_error
+        return results_by_query
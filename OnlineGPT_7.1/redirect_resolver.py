@@ -0,0 +1,155 @@
+# redirect_resolver.py
+import os
+import time
+import sqlite3
+import logging
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import config
+import http_client
+from deadline import request_timeout
+from host_scheduler import get_host_scheduler, HostUnavailable
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+def is_baidu_redirect(link):
+    """
+    判断是否为百度搜索结果的跳转链接（www.baidu.com/link?url=...）。
+    """
+    parsed = urllib.parse.urlsplit(link)
+    return (parsed.hostname or '').lower() == 'www.baidu.com' and parsed.path == '/link'
+
+
+class RedirectCache:
+    """
+    基于SQLite的跳转链接缓存，保存跳转链接到实际URL的映射，在多次运行之间保留。
+    """
+    def __init__(self, path, max_age):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS redirects ("
+                "link TEXT PRIMARY KEY, target TEXT NOT NULL, resolved_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "DELETE FROM redirects WHERE resolved_at < ?", (time.time() - max_age,)
+            )
+            self._conn.commit()
+
+    def get_many(self, links):
+        """
+        返回 {跳转链接: 实际URL}，只包含已缓存的链接。
+        """
+        links = list(links)
+        if not links:
+            return {}
+        placeholders = ', '.join('?' * len(links))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT link, target FROM redirects WHERE link IN ({placeholders}) AND resolved_at >= ?",
+                (*links, time.time() - self.max_age)
+            ).fetchall()
+        return dict(rows)
+
+    def put_many(self, mapping):
+        if not mapping:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO redirects (link, target, resolved_at) VALUES (?, ?, ?)",
+                [(link, target, now) for link, target in mapping.items()]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_redirect_cache = None
+_redirect_cache_lock = threading.Lock()
+
+
+def get_redirect_cache():
+    """
+    获取进程内共享的跳转链接缓存，无法打开时返回None。
+    """
+    global _redirect_cache
+    with _redirect_cache_lock:
+        if _redirect_cache is None:
+            path = os.path.join(config.CACHE_DIR, 'redirect_cache.sqlite3')
+            try:
+                _redirect_cache = RedirectCache(path, config.REDIRECT_CACHE_MAX_AGE)
+                logging.info(f"已打开跳转链接缓存: {path}")
+            except (sqlite3.Error, OSError) as e:
+                logging.error(f"打开跳转链接缓存失败，将不使用缓存：{e}")
+                return None
+    return _redirect_cache
+
+
+def resolve_redirect(link, deadline=None):
+    """
+    用不跟随跳转的HEAD请求获取跳转链接的目标URL，无法解析时返回None。
+    """
+    if deadline is not None and deadline.expired():
+        return None
+    timeout = min(config.REDIRECT_RESOLVE_TIMEOUT, request_timeout(deadline))
+    try:
+        # 跳转请求不消耗搜索结果页面的令牌，避免解析大量链接时阻塞结果列表；仍受主机并发数和熔断限制
+        with get_host_scheduler().slot(link, failures=http_client.HOST_FAILURES, rate_limited=False):
+            response = http_client.head(link, timeout=timeout, allow_redirects=False)
+    except HostUnavailable as e:
+        logging.warning(f"跳过解析跳转链接 {link}：{e}")
+        return None
+    except requests.RequestException as e:
+        logging.warning(f"解析跳转链接失败 ({link}): {e}")
+        return None
+    location = response.headers.get('Location')
+    if response.status_code not in REDIRECT_STATUSES or not location:
+        logging.debug(f"跳转链接未返回目标地址（状态码 {response.status_code}）：{link}")
+        return None
+    return urllib.parse.urljoin(link, location)
+
+
+def resolve_baidu_links(results, deadline=None):
+    """
+    将百度结果中的跳转链接替换为实际URL，先查缓存，未命中的并行解析并写入缓存。
+    无法解析的链接保持不变，抓取页面时仍会跟随跳转。
+    """
+    if not config.REDIRECT_RESOLVE_ENABLED:
+        return results
+    links = {result['link'] for result in results if is_baidu_redirect(result['link'])}
+    if not links:
+        return results
+
+    cache = get_redirect_cache()
+    resolved = cache.get_many(links) if cache else {}
+    pending = [link for link in links if link not in resolved]
+    if pending:
+        started = time.monotonic()
+        workers = min(len(pending), config.REDIRECT_RESOLVE_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='redirect') as executor:
+            targets = executor.map(lambda link: resolve_redirect(link, deadline), pending)
+            fresh = {link: target for link, target in zip(pending, targets) if target}
+        if cache:
+            cache.put_many(fresh)
+        resolved.update(fresh)
+        logging.info(
+            f"解析百度跳转链接 {len(fresh)}/{len(pending)} 个，"
+            f"耗时 {time.monotonic() - started:.2f} 秒，缓存命中 {len(links) - len(pending)} 个。"
+        )
+
+    for result in results:
+        target = resolved.get(result['link'])
+        if target:
+            result['link'] = target
+    return results
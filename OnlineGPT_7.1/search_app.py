@@ -2,18 +2,24 @@
 import sys
 import logging
 import os
+import bisect
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QTextEdit, QVBoxLayout,
     QHBoxLayout, QMessageBox, QFileDialog, QProgressBar, QTableWidget,
     QTableWidgetItem, QGroupBox, QHeaderView, QComboBox, QCheckBox,
-    QGridLayout, QSplitter, QShortcut, QFrame, QAction, QMenuBar
+    QGridLayout, QSplitter, QShortcut, QFrame, QAction, QMenuBar, QSpinBox
 )
 from PyQt5.QtCore import Qt, QThread, QUrl
 from PyQt5.QtGui import QFont, QIcon, QDesktopServices, QKeySequence
 from worker import Worker
+from search_engines import ALL_ENGINES
+from warmup import warm_up
+from fetch_engine import shutdown_fetch_engine
+import http_client
 from gui_components import GuiLogHandler, MyLineEdit, MyTextEdit, CheckBoxHeader, CenteredCheckBoxDelegate
 from utils import save_results_to_txt, generate_txt_content
 from language_manager import LanguageManager  # 引入语言管理器
+import config
 
 class SearchApp(QWidget):
     def __init__(self):
@@ -23,7 +29,11 @@ class SearchApp(QWidget):
         self.saved_file = None
         self.all_results = []
         self.current_content = ""
+        self.row_keys = []  # 每行结果的排序键 (关键词序号, 排名)，与表格行一一对应
+        self.search_interrupted = False  # 当前搜索是否被用户中断
         self.init_ui()
+        # 后台预热所选搜索引擎的连接，减少首次搜索的等待
+        warm_up(self.selected_engine())
 
     def init_ui(self):
         """
@@ -83,12 +93,37 @@ class SearchApp(QWidget):
         self.engines = {
             "Google": "Google",
             "Bing": "Bing",
-            "百度": "百度"
+            "百度": "百度",
+            self.language_manager.tr('all_engines'): ALL_ENGINES
         }
         for engine in self.engines.keys():
             self.engine_combo.addItem(engine)
         self.engine_combo.setCurrentText("Google")
         self.engine_combo.setToolTip(self.language_manager.tr('search_engine'))
+        self.engine_combo.currentTextChanged.connect(self.on_engine_changed)
+
+        # 跳过缓存复选框
+        self.bypass_cache_checkbox = QCheckBox(self.language_manager.tr('bypass_cache'))
+        self.bypass_cache_checkbox.setFont(label_font)
+        self.bypass_cache_checkbox.setToolTip(self.language_manager.tr('bypass_cache_tooltip'))
+
+        # 超量抓取复选框
+        self.overfetch_checkbox = QCheckBox(self.language_manager.tr('overfetch'))
+        self.overfetch_checkbox.setFont(label_font)
+        self.overfetch_checkbox.setToolTip(self.language_manager.tr('overfetch_tooltip'))
+        self.overfetch_checkbox.setChecked(config.OVERFETCH_ENABLED)
+
+        # 整次搜索的时间上限，0表示不限制
+        self.time_budget_label = QLabel(self.language_manager.tr('time_budget'))
+        self.time_budget_label.setFont(label_font)
+        self.time_budget_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        self.time_budget_spinbox = QSpinBox()
+        self.time_budget_spinbox.setFont(input_font)
+        self.time_budget_spinbox.setRange(0, 120)
+        self.time_budget_spinbox.setSuffix(" s")
+        self.time_budget_spinbox.setSpecialValueText(self.language_manager.tr('time_budget_unlimited'))
+        self.time_budget_spinbox.setValue(config.SEARCH_TIME_BUDGET)
+        self.time_budget_spinbox.setToolTip(self.language_manager.tr('time_budget_tooltip'))
 
         # 搜索结果数量
         self.result_num_label = QLabel(self.language_manager.tr('search_number'))
@@ -217,6 +252,10 @@ class SearchApp(QWidget):
         engine_layout = QHBoxLayout()
         engine_layout.addWidget(self.engine_label)
         engine_layout.addWidget(self.engine_combo)
+        engine_layout.addWidget(self.bypass_cache_checkbox)
+        engine_layout.addWidget(self.overfetch_checkbox)
+        engine_layout.addWidget(self.time_budget_label)
+        engine_layout.addWidget(self.time_budget_spinbox)
         engine_layout.setSpacing(5)
         search_layout.addLayout(engine_layout, 0, 1)
         search_layout.addLayout(search_num_layout, 0, 2, 1, 2)
@@ -529,6 +568,17 @@ class SearchApp(QWidget):
 
         self.engine_label.setText(self.language_manager.tr('search_engine'))
         self.engine_combo.setToolTip(self.language_manager.tr('search_engine'))
+        # 更新“全部引擎”选项（位于最后一项）的显示文本及其映射
+        self.engines = {name: engine for name, engine in self.engines.items() if engine != ALL_ENGINES}
+        self.engines[self.language_manager.tr('all_engines')] = ALL_ENGINES
+        self.engine_combo.setItemText(self.engine_combo.count() - 1, self.language_manager.tr('all_engines'))
+        self.bypass_cache_checkbox.setText(self.language_manager.tr('bypass_cache'))
+        self.bypass_cache_checkbox.setToolTip(self.language_manager.tr('bypass_cache_tooltip'))
+        self.overfetch_checkbox.setText(self.language_manager.tr('overfetch'))
+        self.overfetch_checkbox.setToolTip(self.language_manager.tr('overfetch_tooltip'))
+        self.time_budget_label.setText(self.language_manager.tr('time_budget'))
+        self.time_budget_spinbox.setSpecialValueText(self.language_manager.tr('time_budget_unlimited'))
+        self.time_budget_spinbox.setToolTip(self.language_manager.tr('time_budget_tooltip'))
 
         self.result_num_label.setText(self.language_manager.tr('search_number'))
 
@@ -596,8 +646,20 @@ class SearchApp(QWidget):
             self.question_input.setVisible(False)
             self.search_input.setFocus()
 
+    def selected_engine(self):
+        """
+        返回当前选中的搜索引擎标识。
+        """
+        return self.engines.get(self.engine_combo.currentText(), 'Google')
+
+    def on_engine_changed(self, engine_display):
+        engine = self.engines.get(engine_display)
+        if engine:
+            logging.info(f"切换搜索引擎为 {engine}，后台预热连接。")
+            warm_up(engine)
+
     def on_increment(self):
-        if self.result_num_value < 20:
+        if self.result_num_value < config.MAX_NUM_RESULTS:
             self.result_num_value += 1
             self.result_num_display.setText(str(self.result_num_value))
             logging.info(f"搜索数量增加到 {self.result_num_value}")
@@ -643,9 +705,14 @@ class SearchApp(QWidget):
             custom_question = None
 
         num_results = self.result_num_value
-        engine_display = self.engine_combo.currentText()
-        engine = self.engines.get(engine_display, 'Google')
-        logging.info(f"开始搜索，关键词: {queries}, 数量: {num_results}, 引擎: {engine}")
+        engine = self.selected_engine()
+        use_cache = not self.bypass_cache_checkbox.isChecked()
+        time_budget = self.time_budget_spinbox.value()
+        overfetch = self.overfetch_checkbox.isChecked()
+        logging.info(
+            f"开始搜索，关键词: {queries}, 数量: {num_results}, 引擎: {engine}, "
+            f"使用缓存: {use_cache}, 时间上限: {time_budget}, 只保留有效页面: {overfetch}"
+        )
 
         self.search_button.setEnabled(False)
         self.open_button.setEnabled(False)
@@ -658,18 +725,27 @@ class SearchApp(QWidget):
         self.increment_button.setEnabled(False)
         self.decrement_button.setEnabled(False)
         self.engine_combo.setEnabled(False)
+        self.bypass_cache_checkbox.setEnabled(False)
+        self.overfetch_checkbox.setEnabled(False)
+        self.time_budget_spinbox.setEnabled(False)
 
         self.result_table.setRowCount(0)
+        self.row_keys = []
+        self.search_interrupted = False
         self.status_label.setText(self.language_manager.tr('status_searching'))
         self.progress_bar.setVisible(True)
 
         self.thread = QThread()
-        self.worker = Worker(queries, num_results, engine, custom_question)
+        self.worker = Worker(
+            queries, num_results, engine, custom_question, use_cache, time_budget, overfetch
+        )
         self.worker.moveToThread(self.thread)
 
         self.thread.started.connect(self.worker.run)
         self.worker.finished.connect(self.on_search_complete)
         self.worker.error.connect(self.on_search_error)
+        self.worker.result_found.connect(self.on_result_found)
+        self.worker.result_updated.connect(self.on_result_updated)
         self.worker.finished.connect(self.thread.quit)
         self.worker.finished.connect(self.worker.deleteLater)
         self.thread.finished.connect(self.thread.deleteLater)
@@ -679,6 +755,8 @@ class SearchApp(QWidget):
     def on_interrupt_click(self):
         if self.thread and self.thread.isRunning():
             logging.info("用户中断搜索任务。")
+            self.search_interrupted = True
+            # 工作线程会在一个检查间隔内返回，已取得的部分结果随后通过finished信号送达
             self.worker.stop()
             self.thread.quit()
             self.thread.wait()
@@ -695,6 +773,9 @@ class SearchApp(QWidget):
             self.increment_button.setEnabled(True)
             self.decrement_button.setEnabled(True)
             self.engine_combo.setEnabled(True)
+            self.bypass_cache_checkbox.setEnabled(True)
+            self.overfetch_checkbox.setEnabled(True)
+            self.time_budget_spinbox.setEnabled(True)
         else:
             logging.warning("无正在运行的搜索任务可中断。")
             QMessageBox.information(self, self.language_manager.tr('input_error'), self.language_manager.tr('interrupt_info_no_task'))
@@ -714,32 +795,20 @@ class SearchApp(QWidget):
                 self.reset_ui_after_search_failure()
                 return
 
-            self.result_table.setRowCount(0)
-            for idx, result in enumerate(results):
-                self.result_table.insertRow(idx)
-                checkbox_item = QTableWidgetItem()
-                checkbox_item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
-                checkbox_item.setCheckState(Qt.Checked)
-
-                url_item = QTableWidgetItem(result['link'])
-                url_item.setFont(QFont("微软雅黑", 10))
-                title_item = QTableWidgetItem(result['title'])
-                title_item.setFont(QFont("微软雅黑", 10))
-                snippet_item = QTableWidgetItem(result['snippet'])
-                snippet_item.setFont(QFont("微软雅黑", 9))
-                content_item = QTableWidgetItem(result['content'])
-                content_item.setFont(QFont("微软雅黑", 9))
-
-                self.result_table.setItem(idx, 0, checkbox_item)
-                self.result_table.setItem(idx, 1, url_item)
-                self.result_table.setItem(idx, 2, title_item)
-                self.result_table.setItem(idx, 3, snippet_item)
-                self.result_table.setItem(idx, 4, content_item)
+            # 结果行已在搜索过程中逐条加入，这里仅补齐缺失行并写入最终内容
+            for result in results:
+                self.on_result_found(result)
+                self.on_result_updated(result)
 
             self.result_table.itemChanged.connect(self.on_checkbox_state_changed)
             self.update_saved_content()
 
-            self.status_label.setText(self.language_manager.tr('status_search_complete'))
+            if self.search_interrupted:
+                self.status_label.setText(
+                    self.language_manager.tr('status_search_interrupted_partial').format(len(results))
+                )
+            else:
+                self.status_label.setText(self.language_manager.tr('status_search_complete'))
             self.save_button.setEnabled(True)
             self.open_button.setEnabled(True)
             self.copy_button.setEnabled(True)
@@ -750,6 +819,9 @@ class SearchApp(QWidget):
             self.increment_button.setEnabled(True)
             self.decrement_button.setEnabled(True)
             self.engine_combo.setEnabled(True)
+            self.bypass_cache_checkbox.setEnabled(True)
+            self.overfetch_checkbox.setEnabled(True)
+            self.time_budget_spinbox.setEnabled(True)
 
             if self.advanced_mode_checkbox.isChecked():
                 self.search_input_advanced.setFocus()
@@ -759,16 +831,76 @@ class SearchApp(QWidget):
             logging.info("搜索完成，结果已展示。")
             self.copy_results_silently()
 
+        elif self.search_interrupted:
+            # 中断前尚未取得任何结果，界面已在中断时恢复
+            self.result_table.setRowCount(0)
+            self.row_keys = []
+            logging.info("搜索被中断，没有可保留的结果。")
         else:
             self.result_table.setRowCount(0)
+            self.row_keys = []
             self.status_label.setText(self.language_manager.tr('status_search_failed'))
             QMessageBox.information(self, self.language_manager.tr('input_error'), self.language_manager.tr('status_search_failed'))
             logging.info("搜索完成但无结果。")
             self.reset_ui_after_search_failure()
 
+    def result_row_key(self, result):
+        return (result.get('query_index', 0), result.get('rank', 0))
+
+    def on_result_found(self, result):
+        """
+        搜索结果页解析出一条结果后立即插入表格，按关键词顺序和排名排列。
+        """
+        key = self.result_row_key(result)
+        row = bisect.bisect_left(self.row_keys, key)
+        if row < len(self.row_keys) and self.row_keys[row] == key:
+            return
+        self.row_keys.insert(row, key)
+        # 逐行插入时不触发复选框状态变化的处理
+        self.result_table.blockSignals(True)
+        self.result_table.insertRow(row)
+
+        checkbox_item = QTableWidgetItem()
+        checkbox_item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
+        checkbox_item.setCheckState(Qt.Checked)
+
+        url_item = QTableWidgetItem(result['link'])
+        url_item.setFont(QFont("微软雅黑", 10))
+        title_item = QTableWidgetItem(result['title'])
+        title_item.setFont(QFont("微软雅黑", 10))
+        snippet_item = QTableWidgetItem(result['snippet'])
+        snippet_item.setFont(QFont("微软雅黑", 9))
+        content_item = QTableWidgetItem(result['content'])
+        content_item.setFont(QFont("微软雅黑", 9))
+
+        self.result_table.setItem(row, 0, checkbox_item)
+        self.result_table.setItem(row, 1, url_item)
+        self.result_table.setItem(row, 2, title_item)
+        self.result_table.setItem(row, 3, snippet_item)
+        self.result_table.setItem(row, 4, content_item)
+        self.result_table.blockSignals(False)
+        self.status_label.setText(
+            self.language_manager.tr('status_streaming').format(len(self.row_keys))
+        )
+
+    def on_result_updated(self, result):
+        """
+        单条结果的页面内容到达后更新对应行。
+        """
+        key = self.result_row_key(result)
+        row = bisect.bisect_left(self.row_keys, key)
+        if row >= len(self.row_keys) or self.row_keys[row] != key:
+            return
+        content_item = self.result_table.item(row, 4)
+        if content_item is not None:
+            self.result_table.blockSignals(True)
+            content_item.setText(result['content'])
+            self.result_table.blockSignals(False)
+
     def on_search_error(self, error_message):
         self.progress_bar.setVisible(False)
         self.result_table.setRowCount(0)
+        self.row_keys = []
         self.status_label.setText(self.language_manager.tr('status_search_failed'))
         QMessageBox.critical(self, self.language_manager.tr('input_error'), f"{self.language_manager.tr('status_search_failed')}\n{error_message}")
         logging.error(f"搜索错误：{error_message}")
@@ -785,6 +917,9 @@ class SearchApp(QWidget):
         self.increment_button.setEnabled(True)
         self.decrement_button.setEnabled(True)
         self.engine_combo.setEnabled(True)
+        self.bypass_cache_checkbox.setEnabled(True)
+        self.overfetch_checkbox.setEnabled(True)
+        self.time_budget_spinbox.setEnabled(True)
         self.interrupt_button.setEnabled(False)
 
         if self.advanced_mode_checkbox.isChecked():
@@ -982,6 +1117,9 @@ class SearchApp(QWidget):
         if self.thread and self.thread.isRunning():
             self.worker.stop()
             self.thread.quit()
+        # 释放抓取线程和连接池中的连接
+        shutdown_fetch_engine()
+        http_client.close()
         event.accept()
 
 
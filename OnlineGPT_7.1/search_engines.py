@@ -1,31 +1,101 @@
 # search_engines.py
+import re
 import logging
 import urllib.parse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from bs4 import BeautifulSoup
-from utils import get_page_content
-import charset_normalizer
+import http_client
+from html_parser import parse_html
+from encoding import decode_html
+import config
+from serp_cache import get_serp_cache
+from deadline import request_timeout
+from host_scheduler import get_host_scheduler, HostUnavailable
+from url_canon import canonical_key, unwrap_link
+from redirect_resolver import resolve_baidu_links
+
+# 各搜索引擎结果页的结构定义：
+# region_start/region_end 为结果区域起止处元素的id，用于预先截取结果区域；
+# item 为单个结果容器的 (标签名, class)，用于限制解析范围和选取结果。
+SERP_LAYOUTS = {
+    'Google': {
+        'region_start': ('rso', 'search'),
+        'region_end': ('botstuff', 'bottomads', 'foot'),
+        'item': ('div', 'tF2Cxc'),
+    },
+    'Bing': {
+        'region_start': ('b_results',),
+        'region_end': ('b_context', 'b_footer'),
+        'item': ('li', 'b_algo'),
+    },
+    '百度': {
+        'region_start': ('content_left',),
+        'region_end': ('page', 'content_right', 'foot'),
+        'item': ('div', 'result'),
+    },
+}
+
+_ID_PREFIX_RE = re.compile(r'\bid\s*=\s*["\']?$', re.I)
+
+def _find_element(text, element_id, start=0):
+    """
+    查找带有指定id属性的标签，返回其'<'的位置，找不到时返回-1。
+    先用str.find定位id值，再检查前后文，避免正则逐字符扫描整页。
+    """
+    position = text.find(element_id, start)
+    while position >= 0:
+        after = text[position + len(element_id):position + len(element_id) + 1]
+        if after in ('"', "'", ' ', '>') and _ID_PREFIX_RE.search(text, max(position - 8, start), position):
+            return text.rfind('<', start, position)
+        position = text.find(element_id, position + 1)
+    return -1
+
+def slice_result_region(text, layout):
+    """
+    截取结果区域所在的HTML片段，跳过其前后的内联脚本、样式和页眉页脚。
+    找不到区域起点时返回原文。
+    """
+    start = -1
+    for element_id in layout['region_start']:
+        start = _find_element(text, element_id)
+        if start >= 0:
+            break
+    if start < 0:
+        return text
+
+    end = len(text)
+    for element_id in layout['region_end']:
+        position = _find_element(text, element_id, start + 1)
+        if start < position < end:
+            end = position
+    return text[start:end]
 
-def get_google_search_results(query, num_results=5, worker=None):
+def parse_serp(text, engine_name):
     """
-    获取Google搜索结果，并爬取每个结果页面的内容。
+    只解析搜索结果页中的结果区域，返回各结果容器节点的列表。
     """
-    query_encoded = urllib.parse.quote_plus(query)
-    url = f"https://www.google.com/search?q={query_encoded}&num={num_results}"
-
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/113.0.0.0 Safari/537.36"
-        ),
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
-    }
-
-    logging.info(f"发送请求到Google URL: {url}")
+    layout = SERP_LAYOUTS[engine_name]
+    tag, class_name = layout['item']
+    if config.SERP_PRESCAN:
+        region = slice_result_region(text, layout)
+        logging.debug(f"{engine_name}结果区域: {len(region)} / {len(text)} 字符")
+        document = parse_html(region, parse_only=layout['item'])
+    else:
+        document = parse_html(text)
+    return document.css(f'{tag}.{class_name}')
+
+def fetch_serp_text(url, engine_name, deadline=None):
+    """
+    请求搜索结果页面并返回解码后的HTML文本。
+    指定时间预算时，请求超时不超过剩余时间。
+    """
+    if deadline is not None and deadline.expired():
+        raise Exception(f"搜索时间预算已用完，未请求{engine_name}")
+    logging.info(f"发送请求到{engine_name} URL: {url}")
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        # 按主机限速，避免大批量搜索时触发搜索引擎的限流
+        with get_host_scheduler().slot(url, failures=http_client.HOST_FAILURES):
+            response = http_client.get(url, timeout=request_timeout(deadline))
         response.raise_for_status()
 
         # 获取Content-Type并检查是否为HTML
@@ -34,46 +104,103 @@ def get_google_search_results(query, num_results=5, worker=None):
             logging.error(f"搜索结果页面非HTML内容: {url}，Content-Type: {content_type}")
             raise Exception("搜索结果页面非HTML内容")
 
-        # 使用charset-normalizer检测编码
-        detected = charset_normalizer.from_bytes(response.content).best()
-        encoding = detected.encoding if detected and detected.encoding else 'utf-8'
-
-        # 使用检测到的编码解码内容
-        text = response.content.decode(encoding, errors='replace')
-        logging.info(f"检测到编码: {encoding}，Google搜索结果页面URL: {url}")
+        # 优先使用声明的编码，必要时才进行检测
+        text, encoding = decode_html(response.content, content_type, url)
+        logging.info(f"检测到编码: {encoding}，{engine_name}搜索结果页面URL: {url}")
+    except HostUnavailable as e:
+        logging.error(f"{engine_name}暂时不可用：{e}")
+        raise Exception(f"{engine_name}暂时不可用：{e}")
     except requests.RequestException as e:
-        logging.error(f"请求Google失败：{e}")
-        raise Exception(f"请求Google失败：{e}")
+        logging.error(f"请求{engine_name}失败：{e}")
+        raise Exception(f"请求{engine_name}失败：{e}")
     except Exception as e:
-        logging.error(f"解码Google搜索结果页面失败：{e}")
-        raise Exception(f"解码Google搜索结果页面失败：{e}")
+        logging.error(f"解码{engine_name}搜索结果页面失败：{e}")
+        raise Exception(f"解码{engine_name}搜索结果页面失败：{e}")
+    return text
+
+def _fetch_serp_pages(engine_name, urls, deadline=None):
+    """
+    并行请求多个搜索结果页，按页码顺序返回HTML文本，失败的页为None。
+    第一页失败时抛出异常；后续页失败时记录日志并忽略，使用其余页的结果。
+    """
+    if len(urls) == 1:
+        return [fetch_serp_text(urls[0], engine_name, deadline)]
+    texts = []
+    with ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix='serp-page') as executor:
+        futures = [executor.submit(fetch_serp_text, url, engine_name, deadline) for url in urls]
+        for page, future in enumerate(futures):
+            try:
+                texts.append(future.result())
+            except Exception as e:
+                if page == 0:
+                    raise
+                logging.error(f"获取{engine_name}第 {page + 1} 页搜索结果失败，忽略该页：{e}")
+                texts.append(None)
+    return texts
+
+def _search_paged(engine_name, query, num_results, deadline, build_url, parse_results,
+                  resolve_links=None):
+    """
+    搜索引擎单页返回的结果数有上限，需要更多结果时同时请求多个结果页，
+    按页码顺序合并并去除重复链接，最多返回num_results个结果。
+    build_url(query_encoded, offset, page_size) 生成从第offset个结果开始的结果页URL，
+    parse_results(text) 解析一页搜索结果，resolve_links(results, deadline) 在去重前替换跳转链接。
+    """
+    query_encoded = urllib.parse.quote_plus(query)
+    page_size = min(num_results, config.SERP_PAGE_SIZES[engine_name])
+    pages = min(-(-num_results // page_size), config.SERP_MAX_PAGES)
+    urls = [build_url(query_encoded, page * page_size, page_size) for page in range(pages)]
+    texts = _fetch_serp_pages(engine_name, urls, deadline)
+
+    parsed = [result for text in texts if text is not None for result in parse_results(text)]
+    if resolve_links is not None:
+        parsed = resolve_links(parsed, deadline)
+
+    results = []
+    seen = set()
+    for result in parsed:
+        if result['link'] != "No link":
+            key = canonical_key(result['link'])
+            if key in seen:
+                continue
+            seen.add(key)
+        results.append(result)
+        if len(results) >= num_results:
+            break
+    logging.info(f"解析出 {len(results)} 个{engine_name}搜索结果（{pages} 页）。")
+    return results
 
-    soup = BeautifulSoup(text, 'html.parser')
+def _google_url(query_encoded, offset, page_size):
+    url = f"https://www.google.com/search?q={query_encoded}&num={page_size}"
+    return f"{url}&start={offset}" if offset else url
 
+def _parse_google(text):
     results = []
 
     # 根据Google当前的HTML结构进行解析
-    for g in soup.find_all('div', class_='tF2Cxc'):
+    for g in parse_serp(text, 'Google'):
         # 提取标题
-        title_tag = g.find('h3')
-        title = title_tag.get_text(separator=' ', strip=True) if title_tag else "No title"
+        title_tag = g.css_first('h3')
+        title = title_tag.text(separator=' ', strip=True) if title_tag else "No title"
 
         # 提取URL
-        link_tag = g.find('a')
-        link = link_tag['href'] if link_tag and 'href' in link_tag.attrs else "No link"
+        link_tag = g.css_first('a')
+        link = (link_tag.attr('href') if link_tag else None) or "No link"
+        # 无JS版本的结果链接经过 /url?q= 跳转
+        link = unwrap_link(link)
 
         # 提取摘要内容
         snippet = ""
         possible_snippet_classes = ['VwiC3b', 'IsZvec', 'aCOpRe']
         for cls in possible_snippet_classes:
-            snippet_tag = g.find('div', class_=cls)
+            snippet_tag = g.css_first(f'div.{cls}')
             if snippet_tag:
-                snippet = snippet_tag.get_text(separator=' ', strip=True)
+                snippet = snippet_tag.text(separator=' ', strip=True)
                 break
         if not snippet:
-            snippet_tag = g.find('span', class_='aCOpRe')
+            snippet_tag = g.css_first('span.aCOpRe')
             if snippet_tag:
-                snippet = snippet_tag.get_text(separator=' ', strip=True)
+                snippet = snippet_tag.text(separator=' ', strip=True)
         if not snippet:
             snippet = "No content"
 
@@ -87,95 +214,36 @@ def get_google_search_results(query, num_results=5, worker=None):
             'content': "正在获取内容...",
             'engine': 'Google'  # 添加搜索引擎标识
         })
-
-        if len(results) >= num_results:
-            break
-    logging.info(f"解析出 {len(results)} 个Google搜索结果。")
-
-    # 使用线程池并行抓取每个链接的内容
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_result = {}
-        for result in results:
-            if worker and not worker.is_running:
-                logging.info("抓取内容任务被中断。")
-                break
-            future = executor.submit(get_page_content, result['link'], worker)
-            future_to_result[future] = result
-
-        for future in as_completed(future_to_result):
-            if worker and not worker.is_running:
-                logging.info("抓取内容任务被中断。")
-                break
-            result = future_to_result[future]
-            try:
-                content = future.result()
-                result['content'] = content
-            except Exception as e:
-                logging.error(f"抓取内容时出错 ({result['link']}): {e}")
-                result['content'] = "无法获取内容"
-
     return results
 
-def get_bing_search_results(query, num_results=5, worker=None):
+def search_google(query, num_results=5, deadline=None):
     """
-    获取Bing搜索结果，并爬取每个结果页面的内容。
+    获取Google搜索结果列表（不抓取页面内容）。
     """
-    query_encoded = urllib.parse.quote_plus(query)
-    url = f"https://www.bing.com/search?q={query_encoded}&count={num_results}"
-
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/113.0.0.0 Safari/537.36"
-        ),
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
-    }
-
-    logging.info(f"发送请求到Bing URL: {url}")
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        # 获取Content-Type并检查是否为HTML
-        content_type = response.headers.get('Content-Type', '')
-        if 'text/html' not in content_type:
-            logging.error(f"搜索结果页面非HTML内容: {url}，Content-Type: {content_type}")
-            raise Exception("搜索结果页面非HTML内容")
+    return _search_paged('Google', query, num_results, deadline, _google_url, _parse_google)
 
-        # 使用charset-normalizer检测编码
-        detected = charset_normalizer.from_bytes(response.content).best()
-        encoding = detected.encoding if detected and detected.encoding else 'utf-8'
-
-        # 使用检测到的编码解码内容
-        text = response.content.decode(encoding, errors='replace')
-        logging.info(f"检测到编码: {encoding}，Bing搜索结果页面URL: {url}")
-    except requests.RequestException as e:
-        logging.error(f"请求Bing失败：{e}")
-        raise Exception(f"请求Bing失败：{e}")
-    except Exception as e:
-        logging.error(f"解码Bing搜索结果页面失败：{e}")
-        raise Exception(f"解码Bing搜索结果页面失败：{e}")
-
-    soup = BeautifulSoup(text, 'html.parser')
+def _bing_url(query_encoded, offset, page_size):
+    url = f"https://www.bing.com/search?q={query_encoded}&count={page_size}"
+    # Bing的first参数从1开始计数
+    return f"{url}&first={offset + 1}" if offset else url
 
+def _parse_bing(text):
     results = []
 
     # 根据Bing当前的HTML结构进行解析
-    for li in soup.find_all('li', class_='b_algo'):
+    for li in parse_serp(text, 'Bing'):
         # 提取标题和链接
-        h2 = li.find('h2')
-        if h2 and h2.find('a'):
-            a_tag = h2.find('a')
-            title = a_tag.get_text(separator=' ', strip=True)
-            link = a_tag['href']
+        a_tag = li.css_first('h2 a')
+        if a_tag:
+            title = a_tag.text(separator=' ', strip=True)
+            link = a_tag.attr('href') or "No link"
         else:
             title = "No title"
             link = "No link"
 
         # 提取摘要
-        snippet_tag = li.find('p')
-        snippet = snippet_tag.get_text(separator=' ', strip=True) if snippet_tag else "No content"
+        snippet_tag = li.css_first('p')
+        snippet = snippet_tag.text(separator=' ', strip=True) if snippet_tag else "No content"
 
         results.append({
             'title': title,
@@ -184,96 +252,36 @@ def get_bing_search_results(query, num_results=5, worker=None):
             'content': "正在获取内容...",
             'engine': 'Bing'  # 添加搜索引擎标识
         })
-
-        if len(results) >= num_results:
-            break
-    logging.info(f"解析出 {len(results)} 个Bing搜索结果。")
-
-    # 使用线程池并行抓取每个链接的内容
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_result = {}
-        for result in results:
-            if worker and not worker.is_running:
-                logging.info("抓取内容任务被中断。")
-                break
-            future = executor.submit(get_page_content, result['link'], worker)
-            future_to_result[future] = result
-
-        for future in as_completed(future_to_result):
-            if worker and not worker.is_running:
-                logging.info("抓取内容任务被中断。")
-                break
-            result = future_to_result[future]
-            try:
-                content = future.result()
-                result['content'] = content
-            except Exception as e:
-                logging.error(f"抓取内容时出错 ({result['link']}): {e}")
-                result['content'] = "无法获取内容"
-
     return results
 
-def get_baidu_search_results(query, num_results=5, worker=None):
+def search_bing(query, num_results=5, deadline=None):
     """
-    获取百度搜索结果，并爬取每个结果页面的内容。
+    获取Bing搜索结果列表（不抓取页面内容）。
     """
-    query_encoded = urllib.parse.quote_plus(query)
-    url = f"https://www.baidu.com/s?wd={query_encoded}&rn={num_results}&ie=utf-8"
-
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/113.0.0.0 Safari/537.36"
-        ),
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
-    }
-
-    logging.info(f"发送请求到百度 URL: {url}")
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        # 获取Content-Type并检查是否为HTML
-        content_type = response.headers.get('Content-Type', '')
-        if 'text/html' not in content_type:
-            logging.error(f"搜索结果页面非HTML内容: {url}，Content-Type: {content_type}")
-            raise Exception("搜索结果页面非HTML内容")
-
-        # 使用charset-normalizer检测编码
-        detected = charset_normalizer.from_bytes(response.content).best()
-        encoding = detected.encoding if detected and detected.encoding else 'utf-8'
-
-        # 使用检测到的编码解码内容
-        text = response.content.decode(encoding, errors='replace')
-        logging.info(f"检测到编码: {encoding}，百度搜索结果页面URL: {url}")
-    except requests.RequestException as e:
-        logging.error(f"请求百度失败：{e}")
-        raise Exception(f"请求百度失败：{e}")
-    except Exception as e:
-        logging.error(f"解码百度搜索结果页面失败：{e}")
-        raise Exception(f"解码百度搜索结果页面失败：{e}")
+    return _search_paged('Bing', query, num_results, deadline, _bing_url, _parse_bing)
 
-    soup = BeautifulSoup(text, 'html.parser')
+def _baidu_url(query_encoded, offset, page_size):
+    url = f"https://www.baidu.com/s?wd={query_encoded}&rn={page_size}&ie=utf-8"
+    return f"{url}&pn={offset}" if offset else url
 
+def _parse_baidu(text):
     results = []
 
     # 根据百度当前的HTML结构进行解析
-    for div in soup.find_all('div', class_='result'):
-        h3 = div.find('h3')
-        if h3 and h3.find('a'):
-            a_tag = h3.find('a')
-            title = a_tag.get_text(separator=' ', strip=True)
-            link = a_tag['href']
+    for div in parse_serp(text, '百度'):
+        a_tag = div.css_first('h3 a')
+        if a_tag:
+            title = a_tag.text(separator=' ', strip=True)
+            link = a_tag.attr('href') or "No link"
         else:
             title = "No title"
             link = "No link"
 
         # 提取摘要
-        snippet_tag = div.find('div', class_='c-abstract')
+        snippet_tag = div.css_first('div.c-abstract')
         if not snippet_tag:
-            snippet_tag = div.find('div', class_='c-span18 c-span-last')
-        snippet = snippet_tag.get_text(separator=' ', strip=True) if snippet_tag else "No content"
+            snippet_tag = div.css_first('div.c-span18.c-span-last')
+        snippet = snippet_tag.text(separator=' ', strip=True) if snippet_tag else "No content"
 
         results.append({
             'title': title,
@@ -282,31 +290,112 @@ def get_baidu_search_results(query, num_results=5, worker=None):
             'content': "正在获取内容...",
             'engine': '百度'  # 添加搜索引擎标识
         })
+    return results
 
-        if len(results) >= num_results:
-            break
-    logging.info(f"解析出 {len(results)} 个百度搜索结果。")
-
-    # 使用线程池并行抓取每个链接的内容
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_result = {}
-        for result in results:
-            if worker and not worker.is_running:
-                logging.info("抓取内容任务被中断。")
-                break
-            future = executor.submit(get_page_content, result['link'], worker)
-            future_to_result[future] = result
-
-        for future in as_completed(future_to_result):
-            if worker and not worker.is_running:
-                logging.info("抓取内容任务被中断。")
-                break
-            result = future_to_result[future]
+def search_baidu(query, num_results=5, deadline=None):
+    """
+    获取百度搜索结果列表（不抓取页面内容）。
+    """
+    return _search_paged(
+        '百度', query, num_results, deadline, _baidu_url, _parse_baidu, resolve_baidu_links
+    )
+
+# 搜索引擎名称到搜索函数的映射
+SEARCH_FUNCTIONS = {
+    'Google': search_google,
+    'Bing': search_bing,
+    '百度': search_baidu,
+}
+
+# 同时使用所有搜索引擎的标识
+ALL_ENGINES = 'All'
+
+# 各搜索引擎的首页，用于启动时预热连接
+ENGINE_HOMEPAGES = {
+    'Google': 'https://www.google.com/',
+    'Bing': 'https://www.bing.com/',
+    '百度': 'https://www.baidu.com/',
+}
+
+def merge_results(result_lists):
+    """
+    使用倒数排名融合（RRF）合并多个搜索引擎的结果列表，并去除重复URL。
+    重复结果保留排名最靠前的标题和摘要，engine字段记录所有命中的引擎。
+    """
+    merged = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            if result['link'] == "No link":
+                continue
+            key = canonical_key(result['link'])
+            score = 1.0 / (config.RRF_K + rank)
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = {'result': dict(result), 'score': score, 'best_rank': rank}
+                continue
+            entry['score'] += score
+            if result['engine'] not in entry['result']['engine'].split(', '):
+                entry['result']['engine'] += f", {result['engine']}"
+            if rank < entry['best_rank']:
+                entry['best_rank'] = rank
+                entry['result']['title'] = result['title']
+                entry['result']['snippet'] = result['snippet']
+
+    ranked = sorted(merged.values(), key=lambda entry: entry['score'], reverse=True)
+    return [entry['result'] for entry in ranked]
+
+def search_all_engines(query, num_results=5, use_cache=True, deadline=None):
+    """
+    并行查询所有搜索引擎，合并去重后返回融合排名最靠前的num_results个结果。
+    部分引擎失败时使用其余引擎的结果，全部失败时抛出第一个错误。
+    """
+    engines = list(SEARCH_FUNCTIONS.keys())
+    result_lists = []
+    first_error = None
+    with ThreadPoolExecutor(max_workers=len(engines), thread_name_prefix='engine') as executor:
+        futures = [
+            executor.submit(search, engine, query, num_results, use_cache, deadline)
+            for engine in engines
+        ]
+        for engine, future in zip(engines, futures):
             try:
-                content = future.result()
-                result['content'] = content
+                result_lists.append(future.result())
             except Exception as e:
-                logging.error(f"抓取内容时出错 ({result['link']}): {e}")
-                result['content'] = "无法获取内容"
-
-    return results
\ No newline at end of file
+                logging.error(f"{engine}搜索失败，忽略该引擎的结果：{e}")
+                if first_error is None:
+                    first_error = e
+
+    if not result_lists and first_error is not None:
+        raise first_error
+    results = merge_results(result_lists)
+    total = sum(len(engine_results) for engine_results in result_lists)
+    logging.info(
+        f"多引擎搜索共获得 {total} 个结果，合并去重后剩余 {len(results)} 个，保留前 {num_results} 个。"
+    )
+    # 与单引擎模式一致，结果数量不超过用户设置的数量
+    return results[:num_results]
+
+def search(engine, query, num_results=5, use_cache=True, deadline=None):
+    """
+    使用指定引擎搜索，返回结果列表（不抓取页面内容）。
+    use_cache为True时优先使用搜索结果页缓存；为False时跳过读取缓存，但仍会写入新结果。
+    deadline为整次搜索的时间预算，可为None。
+    """
+    if engine == ALL_ENGINES:
+        return search_all_engines(query, num_results, use_cache, deadline)
+    search_function = SEARCH_FUNCTIONS.get(engine)
+    if search_function is None:
+        raise Exception("不支持的搜索引擎。")
+
+    cache = get_serp_cache()
+    if use_cache:
+        cached = cache.get(engine, query, num_results)
+        if cached is not None:
+            logging.info(f"搜索结果缓存命中：{engine} - {query}")
+            return cached
+
+    results = search_function(query, num_results, deadline)
+    # 空结果可能是验证码或异常页面，不写入缓存
+    if results:
+        cache.put(engine, query, num_results, results)
+    return results
@@ -0,0 +1,66 @@
+# serp_cache.py
+import time
+import threading
+from collections import OrderedDict
+import config
+
+
+def normalize_query(query):
+    """
+    规范化查询词：合并空白并转为小写。
+    """
+    return ' '.join(query.split()).lower()
+
+
+class SerpCache:
+    """
+    搜索结果页缓存。
+    以 (引擎, 规范化查询词, 结果数量) 为键保存解析后的结果列表，
+    带TTL并按LRU策略限制条目数量。
+    """
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, engine, query, num_results):
+        return (engine, normalize_query(query), num_results)
+
+    def get(self, engine, query, num_results):
+        """
+        返回缓存结果的副本，未命中或已过期时返回None。
+        """
+        key = self._key(engine, query, num_results)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, results = entry
+            if time.time() - stored_at >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return [dict(result) for result in results]
+
+    def put(self, engine, query, num_results, results):
+        key = self._key(engine, query, num_results)
+        with self._lock:
+            self._entries[key] = (time.time(), [dict(result) for result in results])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_serp_cache = SerpCache(config.SERP_CACHE_MAX_ENTRIES, config.SERP_CACHE_TTL)
+
+
+def get_serp_cache():
+    """
+    获取进程内共享的搜索结果页缓存。
+    """
+    return _serp_cache
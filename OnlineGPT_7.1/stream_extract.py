@@ -0,0 +1,77 @@
+# stream_extract.py
+import codecs
+import logging
+import config
+from encoding import declared_encoding
+from extractor import IncrementalExtractor
+
+
+class StreamingExtraction:
+    """
+    边下载边解码和提取正文，作为http_client.read_body的on_chunk回调使用。
+    先缓存页面开头用于确定编码：页面声明了可信编码时开始增量解析，收集到足够正文后通知停止下载；
+    否则放弃增量模式，由调用方在下载完成后按常规流程解码和提取。
+    """
+    def __init__(self, content_type, url):
+        self.content_type = content_type
+        self.url = url
+        # 放弃增量模式后为False
+        self.active = True
+        self.stopped_early = False
+        self._head = []
+        self._head_size = 0
+        self._decoder = None
+        self._extractor = None
+
+    def _start(self):
+        head = b''.join(self._head)
+        self._head = []
+        encoding = declared_encoding(head, self.content_type)
+        if encoding is None:
+            logging.debug(f"页面未声明可信编码，下载完成后再提取正文：{self.url}")
+            self.active = False
+            return
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._extractor = IncrementalExtractor()
+        self._feed(head)
+
+    def _feed(self, chunk, final=False):
+        try:
+            self._extractor.feed(self._decoder.decode(chunk, final))
+        except Exception as e:
+            logging.warning(f"增量提取正文失败，下载完成后再提取 ({self.url}): {e}")
+            self.active = False
+
+    def feed(self, chunk):
+        """
+        接收一块响应体，返回True表示已收集到足够的正文，可以停止下载。
+        """
+        if not self.active:
+            return False
+        if self._extractor is None:
+            self._head.append(chunk)
+            self._head_size += len(chunk)
+            if self._head_size < config.META_SCAN_BYTES:
+                return False
+            self._start()
+        else:
+            self._feed(chunk)
+        limit = config.STREAM_EXTRACT_STOP_CHARS
+        if self.active and limit and self._extractor.content_chars >= limit:
+            self.stopped_early = True
+            return True
+        return False
+
+    def finish(self):
+        """
+        下载结束后返回提取的正文；未进入增量模式或中途失败时返回None。
+        """
+        if self.active and self._extractor is None:
+            # 页面短于编码扫描范围
+            self._start()
+        if not self.active:
+            return None
+        self._feed(b'', final=True)
+        if not self.active:
+            return None
+        return self._extractor.result()
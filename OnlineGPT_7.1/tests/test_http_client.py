@@ -0,0 +1,66 @@
+# test_http_client.py
+"""
+http_client重试策略的测试。
+
+用法：
+    python -m unittest discover tests
+"""
+import os
+import sys
+import threading
+import unittest
+import http.server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+import http_client  # noqa: E402
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """
+    按路径返回固定状态码，并记录每个路径收到的请求数。
+    """
+    hits = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with self.lock:
+            self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        status = int(self.path.strip('/').split('/')[0])
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+class RetryTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.backoff = config.HTTP_RETRY_BACKOFF
+        config.HTTP_RETRY_BACKOFF = 0
+
+    @classmethod
+    def tearDownClass(cls):
+        config.HTTP_RETRY_BACKOFF = cls.backoff
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_persistent_503_is_retried_http_retries_times(self):
+        response = http_client.get(f"{self.base}/503/page", retry=True)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(_Handler.hits['/503/page'], config.HTTP_RETRIES + 1)
+
+    def test_request_without_retry_is_sent_once(self):
+        response = http_client.get(f"{self.base}/429/serp")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(_Handler.hits['/429/serp'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
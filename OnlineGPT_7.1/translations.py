@@ -5,6 +5,9 @@ translations = {
         'search_settings': "Search Settings",
         'advanced_mode': "Advanced Mode",
         'search_engine': "Search Engine:",
+        'all_engines': "All Engines",
+        'bypass_cache': "Bypass Cache",
+        'bypass_cache_tooltip': "Ignore cached search results and page content and fetch everything again",
         'search_number': "Number of Results:",
         'decrement': "-",
         'increment': "+",
@@ -21,6 +24,7 @@ translations = {
         'open_results': "Open Results",
         'status_waiting': "Waiting for input...",
         'status_searching': "Searching, please wait...",
+        'status_streaming': "Searching, {} results received so far...",
         'status_search_complete': "Search complete, results saved and copied.",
         'status_search_failed': "Search failed.",
         'input_error': "Input Error",
@@ -35,6 +39,12 @@ translations = {
         'copy_failure_no_selection': "No content selected.",
         'interrupt_info_no_task': "There is no ongoing search task to interrupt.",
         'interrupt_info_task_interrupted': "Search has been interrupted.",
+        'status_search_interrupted_partial': "Search interrupted, {} partial results kept, saved and copied.",
+        'overfetch': "Useful pages only",
+        'overfetch_tooltip': "Fetch extra results and stop once the requested number of pages with usable content is reached",
+        'time_budget': "Time limit:",
+        'time_budget_unlimited': "None",
+        'time_budget_tooltip': "Return whatever has been fetched when the limit is reached; unfinished results use their snippet",
         'help': "Help",
         'about': "About",
         'about_title': "About OnlineGPT 7.1",
@@ -73,6 +83,9 @@ translations = {
         'search_settings': "搜索设置",
         'advanced_mode': "进阶模式",
         'search_engine': "搜索引擎：",
+        'all_engines': "全部引擎",
+        'bypass_cache': "跳过缓存",
+        'bypass_cache_tooltip': "忽略已缓存的搜索结果和页面内容，全部重新获取",
         'search_number': "搜索数量：",
         'decrement': "-",
         'increment': "+",
@@ -89,6 +102,7 @@ translations = {
         'open_results': "打开结果",
         'status_waiting': "等待输入...",
         'status_searching': "正在搜索，请稍候...",
+        'status_streaming': "正在搜索，已获取 {} 条结果...",
         'status_search_complete': "搜索完成，结果已保存并已自动复制。",
         'status_search_failed': "搜索失败。",
         'input_error': "输入错误",
@@ -103,6 +117,12 @@ translations = {
         'copy_failure_no_selection': "未选择任何内容。",
         'interrupt_info_no_task': "当前没有正在运行的搜索任务。",
         'interrupt_info_task_interrupted': "搜索已被中断。",
+        'status_search_interrupted_partial': "搜索已中断，保留 {} 条部分结果，已保存并已自动复制。",
+        'overfetch': "只保留有效页面",
+        'overfetch_tooltip': "多抓取一些结果，获得指定数量的有效页面后即结束，跳过无法获取内容的页面",
+        'time_budget': "时间上限：",
+        'time_budget_unlimited': "不限",
+        'time_budget_tooltip': "到达时间上限时返回已获取的结果，未完成的结果使用摘要代替正文",
         'help': "帮助",
         'about': "关于",
         'about_title': "关于 OnlineGPT 7.1",
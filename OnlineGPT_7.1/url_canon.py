@@ -0,0 +1,57 @@
+# url_canon.py
+import urllib.parse
+
+# 不影响页面内容的跟踪参数，比较URL时忽略
+TRACKING_PARAMS = {
+    'gclid', 'fbclid', 'msclkid', 'yclid', 'dclid', 'gbraid', 'wbraid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', 'igshid', 'spm', 'ref_src', 'cmpid',
+}
+TRACKING_PARAM_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _is_tracking(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def unwrap_link(link):
+    """
+    去掉Google的 /url?q= 跳转包装，返回实际的目标URL；其他链接原样返回。
+    """
+    parsed = urllib.parse.urlsplit(link)
+    host = (parsed.hostname or '').lower()
+    if parsed.path != '/url' or (host and not host.startswith(('google.', 'www.google.'))):
+        return link
+    params = urllib.parse.parse_qs(parsed.query)
+    for name in ('q', 'url'):
+        target = params.get(name, [''])[0]
+        if target.startswith(('http://', 'https://')):
+            return target
+    return link
+
+
+def canonical_key(link):
+    """
+    生成用于判断两个链接是否指向同一页面的键：
+    去掉跳转包装，忽略协议、默认端口、主机名大小写、片段、末尾斜杠和跟踪参数，其余查询参数按名称排序。
+    """
+    link = unwrap_link(link.strip())
+    parsed = urllib.parse.urlsplit(link)
+    host = (parsed.hostname or '').lower()
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    if port and port != DEFAULT_PORTS.get(parsed.scheme.lower()):
+        host = f"{host}:{port}"
+    key = f"{host}{parsed.path.rstrip('/')}"
+    params = sorted(
+        (name, value)
+        for name, value in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)
+        if not _is_tracking(name)
+    )
+    if params:
+        key += f"?{urllib.parse.urlencode(params)}"
+    return key or link
@@ -1,11 +1,31 @@
 # utils.py
 import re
+import time
 import logging
 import os
 from datetime import datetime
 import requests
-from bs4 import BeautifulSoup
-import charset_normalizer
+import http_client
+import config
+from html_parser import parse_html
+from extractor import extract_main_text
+from html_minimizer import minimize_html
+from encoding import decode_html
+from page_cache import get_page_cache
+from deadline import request_timeout
+from host_scheduler import get_host_scheduler, HostUnavailable
+from concurrency import get_concurrency_controller
+from hedging import get_hedge_tracker
+import parse_pool
+from stream_extract import StreamingExtraction
+
+# 抓取或提取失败时返回的提示文本，这些内容不会写入缓存
+FAILURE_MESSAGES = (
+    "任务已中断，无法获取内容",
+    "非HTML内容，无法提取",
+    "无法获取内容",
+    "无法提取内容",
+)
 
 def clean_text(text):
     """
@@ -18,70 +38,104 @@ def get_page_content(url, worker=None):
     """
     获取指定URL页面的所有文本内容，处理编码并过滤非HTML内容，同时尽量保留原网页的文本格式。
     """
-    if worker and not worker.is_running:
+    if http_client.should_stop(worker):
         logging.info(f"中断获取页面内容：{url}")
         return "任务已中断，无法获取内容"
 
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/113.0.0.0 Safari/537.36"
-        ),
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
-    }
+    # 先查询页面缓存，有效期内直接返回，过期则发送条件请求；跳过缓存时仍写入新内容
+    cache = get_page_cache()
+    use_cache = worker is None or getattr(worker, 'use_cache', True)
+    entry = cache.get(url) if cache and use_cache else None
+    if entry and cache.is_fresh(entry):
+        logging.info(f"页面缓存命中：{url}")
+        return entry['content']
+
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+        headers = cache.conditional_headers(entry) if entry else None
+        # 按主机限制并发和速率，超时和连接失败计入该主机的熔断状态
+        # 全局并发名额由自适应并发控制器分配，根据耗时和失败情况调整
+        with get_host_scheduler().slot(url, worker, http_client.HOST_FAILURES), \
+                get_concurrency_controller().permit(worker, http_client.HOST_FAILURES):
+            # 流式下载：先根据响应头判断，再按上限读取响应体
+            timeout = request_timeout(getattr(worker, 'deadline', None))
+            # 对冲延迟只参考实际的网络耗时，不含排队、缓存命中和失败的请求
+            started = time.monotonic()
+            with http_client.get(url, timeout=timeout, headers=headers, stream=True, worker=worker, retry=True) as response:
+                if entry and response.status_code == 304:
+                    logging.info(f"页面未修改，使用缓存内容：{url}")
+                    get_hedge_tracker().record(time.monotonic() - started)
+                    cache.touch(url)
+                    return entry['content']
+                response.raise_for_status()
+                content_type = response.headers.get('Content-Type', '')
+                rejected = reject_non_html(content_type, url)
+                if rejected:
+                    return rejected
+                # 增量模式下边下载边提取正文，得到足够的正文后提前结束下载
+                stream = StreamingExtraction(content_type, url) if config.STREAM_EXTRACT else None
+                body = http_client.read_body(
+                    response, config.MAX_PAGE_BYTES, worker, stream.feed if stream else None
+                )
+                get_hedge_tracker().record(time.monotonic() - started)
+    except HostUnavailable as e:
+        logging.warning(f"跳过页面 {url}：{e}")
+        return "无法获取内容"
+    except http_client.FetchAborted:
+        logging.info(f"中断获取页面内容：{url}")
+        return "任务已中断，无法获取内容"
+    except requests.RequestException as e:
+        # 连接被abort_in_flight关闭时按中断处理
+        if http_client.should_stop(worker):
+            logging.info(f"中断获取页面内容：{url}")
+            return "任务已中断，无法获取内容"
+        logging.error(f"获取页面内容失败 ({url}): {e}")
+        return "无法获取内容"
 
-        # 获取Content-Type并检查是否为HTML
-        content_type = response.headers.get('Content-Type', '')
-        if 'text/html' not in content_type:
-            logging.warning(f"非HTML内容，跳过: {url}，Content-Type: {content_type}")
-            return "非HTML内容，无法提取"
+    text = stream.finish() if stream else None
+    if text is not None:
+        content = clean_text(text) or "无法提取内容"
+    else:
+        # 解码和正文提取交给解析进程池，不占用当前进程的GIL
+        content = parse_pool.parse_page(body, content_type, url)
+    if cache and content not in FAILURE_MESSAGES:
+        cache.put(
+            url, content,
+            response.headers.get('ETag'), response.headers.get('Last-Modified')
+        )
+    return content
 
-        # 使用charset-normalizer检测编码
-        detected = charset_normalizer.from_bytes(response.content).best()
-        encoding = detected.encoding if detected and detected.encoding else 'utf-8'
+def reject_non_html(content_type, url):
+    """
+    检查Content-Type，非HTML内容返回提示文本，否则返回None。
+    """
+    if 'text/html' not in content_type:
+        logging.warning(f"非HTML内容，跳过: {url}，Content-Type: {content_type}")
+        return "非HTML内容，无法提取"
+    return None
 
-        # 使用检测到的编码解码内容
-        text = response.content.decode(encoding, errors='replace')
+def parse_page_content(content, content_type, url):
+    """
+    将已下载的页面字节解码并提取正文，供同步和异步抓取引擎共用。
+    """
+    # 检查Content-Type是否为HTML
+    rejected = reject_non_html(content_type, url)
+    if rejected:
+        return rejected
+
+    try:
+        # 优先使用声明的编码，必要时才进行检测
+        text, encoding = decode_html(content, content_type, url)
         logging.info(f"检测到编码: {encoding}，URL: {url}")
-    except requests.RequestException as e:
-        logging.error(f"获取页面内容失败 ({url}): {e}")
-        return "无法获取内容"
     except Exception as e:
         logging.error(f"解码页面内容失败 ({url}): {e}")
         return "无法提取内容"
 
-    soup = BeautifulSoup(text, 'html.parser')
+    # 建树前删除脚本、样式、SVG和注释，减少解析器需要处理的输入
+    if config.HTML_MINIMIZE:
+        text = minimize_html(text)
 
-    # 尝试提取主要内容，首先寻找<article>标签
-    article = soup.find('article')
-    if article:
-        # 使用换行符分隔段落，保留基本格式
-        extracted_text = '\n\n'.join([
-            p.get_text(separator='\n', strip=True)
-            for p in article.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li'])
-        ])
-    else:
-        # 如果没有<article>标签，则提取所有<p>和其他块级标签的内容
-        paragraphs = soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li'])
-        extracted_text = '\n\n'.join([
-            p.get_text(separator='\n', strip=True) for p in paragraphs
-        ])
-
-    # 清洗文本，移除控制字符等
-    extracted_text = clean_text(extracted_text)
-
-    # 如果提取的文本过短，可能需要进一步处理
-    if len(extracted_text) < 200:
-        logging.debug(f"提取内容过短 ({len(extracted_text)} 字符), 使用备用方法。")
-        extracted_text = '\n\n'.join([
-            p.get_text(separator='\n', strip=True)
-            for p in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li'])
-        ])
-        extracted_text = clean_text(extracted_text)
+    # 单次遍历完成样板过滤、段落收集和正文区域打分
+    extracted_text = clean_text(extract_main_text(parse_html(text)))
 
     return extracted_text if extracted_text else "无法提取内容"
 
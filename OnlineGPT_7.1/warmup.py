@@ -0,0 +1,63 @@
+# warmup.py
+import time
+import socket
+import logging
+import threading
+import urllib.parse
+import requests
+import config
+import http_client
+import dns_cache
+from fetch_engine import get_fetch_engine
+from host_scheduler import get_host_scheduler, HostUnavailable
+from search_engines import ENGINE_HOMEPAGES, ALL_ENGINES
+
+# 主机名 -> 上次预热的时间
+_warmed = {}
+_warmed_lock = threading.Lock()
+
+
+def _warm_host(url):
+    """
+    解析主机名并发送一个HEAD请求，使TLS连接留在共享Session的连接池中。
+    """
+    host = urllib.parse.urlsplit(url).hostname
+    started = time.monotonic()
+    try:
+        socket.getaddrinfo(host, 443, type=socket.SOCK_STREAM)
+        with get_host_scheduler().slot(url, failures=http_client.HOST_FAILURES):
+            http_client.head(url, timeout=config.REQUEST_TIMEOUT)
+    except (HostUnavailable, requests.RequestException, OSError) as e:
+        logging.warning(f"预热连接失败 ({host}): {e}")
+        with _warmed_lock:
+            _warmed.pop(host, None)
+        return
+    logging.info(f"已预热到 {host} 的连接，耗时 {time.monotonic() - started:.2f} 秒")
+
+
+def warm_up(engine):
+    """
+    在后台线程中预热所选搜索引擎：启用DNS缓存，启动抓取引擎和解析进程池，
+    并提前建立到搜索引擎主机的连接，减少首次搜索的等待。
+    同一主机在config.PREWARM_MIN_INTERVAL秒内只预热一次。
+    """
+    if not config.PREWARM_ENABLED:
+        return
+    dns_cache.install()
+    engines = list(ENGINE_HOMEPAGES) if engine == ALL_ENGINES else [engine]
+    urls = []
+    now = time.monotonic()
+    with _warmed_lock:
+        for name in engines:
+            url = ENGINE_HOMEPAGES.get(name)
+            if url is None:
+                continue
+            host = urllib.parse.urlsplit(url).hostname
+            if now - _warmed.get(host, float('-inf')) < config.PREWARM_MIN_INTERVAL:
+                continue
+            _warmed[host] = now
+            urls.append(url)
+
+    threading.Thread(target=get_fetch_engine, name='warmup-engine', daemon=True).start()
+    for url in urls:
+        threading.Thread(target=_warm_host, args=(url,), name='warmup', daemon=True).start()
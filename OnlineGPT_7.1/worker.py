@@ -1,12 +1,15 @@
 # worker.py
 import logging
 from PyQt5.QtCore import QObject, pyqtSignal
-from search_engines import (
-    get_google_search_results,
-    get_bing_search_results,
-    get_baidu_search_results
-)
+from pipeline import SearchPipeline
+from deadline import Deadline
 from utils import save_results_to_txt
+from encoding import get_stats as get_encoding_stats
+from html_minimizer import get_stats as get_minimizer_stats
+from hedging import get_stats as get_hedge_stats
+from host_scheduler import get_stats as get_scheduler_stats
+from concurrency import get_stats as get_concurrency_stats
+from dns_cache import get_stats as get_dns_stats
 
 
 class Worker(QObject):
@@ -15,13 +18,20 @@ class Worker(QObject):
     """
     finished = pyqtSignal(list, str)  # 发送结果和文件路径
     error = pyqtSignal(str)
+    result_found = pyqtSignal(object)  # 解析出单条搜索结果
+    result_updated = pyqtSignal(object)  # 单条结果的页面内容已获取
 
-    def __init__(self, queries, num_results=5, engine='Google', custom_question=None):
+    def __init__(self, queries, num_results=5, engine='Google', custom_question=None, use_cache=True,
+                 time_budget=0, overfetch=False):
         super().__init__()
         self.queries = queries  # 接受多个关键词
         self.num_results = num_results
         self.engine = engine  # 搜索引擎
         self.custom_question = custom_question  # 自定义问题
+        self.use_cache = use_cache  # 是否读取缓存
+        self.time_budget = time_budget  # 整次搜索的时间预算（秒），0表示不限制
+        self.deadline = None  # 开始执行时根据时间预算创建
+        self.overfetch = overfetch  # 超量抓取，只保留有效页面
         self._is_running = True  # 添加运行状态标志
 
     @property
@@ -30,58 +40,63 @@ class Worker(QObject):
 
     def stop(self):
         """
-        停止工作线程。
+        停止工作线程；搜索流水线在一个检查间隔内退出，并关闭本任务正在下载的连接。
         """
         self._is_running = False
 
+    def emit_result_found(self, result):
+        # 发送副本，避免界面线程读取时结果仍被修改
+        self.result_found.emit(dict(result))
+
+    def emit_result_updated(self, result):
+        self.result_updated.emit(dict(result))
+
     def run(self):
         """
         执行搜索任务。
         """
         try:
-            all_results = []
             logging.info(
                 f"工作线程开始执行搜索任务，关键词: {self.queries}, "
-                f"结果数量: {self.num_results}, 搜索引擎: {self.engine}"
+                f"结果数量: {self.num_results}, 搜索引擎: {self.engine}, 时间预算: {self.time_budget}"
             )
-            for query in self.queries:
-                if not self.is_running:
-                    logging.info("搜索任务被中断。")
-                    break
-                if self.engine == 'Google':
-                    results = get_google_search_results(
-                        query, self.num_results, self
-                    )
-                elif self.engine == 'Bing':
-                    results = get_bing_search_results(
-                        query, self.num_results, self
-                    )
-                elif self.engine == '百度':
-                    results = get_baidu_search_results(
-                        query, self.num_results, self
-                    )
-                else:
-                    raise Exception("不支持的搜索引擎。")
-                # 添加查询词到结果中
-                for result in results:
-                    result['query'] = query
-                all_results.append(results)
-
-            if not self.is_running:
-                logging.info("搜索任务已被用户中断，停止后续操作。")
-                return
+            if self.time_budget:
+                self.deadline = Deadline(self.time_budget)
+            # 所有关键词并发搜索，结果按关键词顺序返回
+            pipeline = SearchPipeline(
+                self.engine, self.num_results, self,
+                on_result=self.emit_result_found,
+                on_content=self.emit_result_updated,
+                use_cache=self.use_cache,
+                deadline=self.deadline,
+                overfetch=self.overfetch
+            )
+            all_results = pipeline.run(self.queries)
 
             # 展平结果列表
             flat_results = [item for sublist in all_results for item in sublist]
 
-            filename = save_results_to_txt(
-                flat_results,
-                ', '.join(self.queries),
-                engine=self.engine,
-                custom_question=self.custom_question
-            )
+            # 被中断时仍保存并返回已取得的部分结果
+            if not self.is_running:
+                logging.info(f"搜索任务已被用户中断，保留 {len(flat_results)} 条部分结果。")
+
+            # 没有任何结果时不保存，避免用空内容覆盖上一次的结果文件
+            filename = ''
+            if flat_results:
+                filename = save_results_to_txt(
+                    flat_results,
+                    ', '.join(self.queries),
+                    engine=self.engine,
+                    custom_question=self.custom_question
+                )
             self.finished.emit(flat_results, filename)
             logging.info("工作线程搜索任务完成。")
+            logging.info(f"编码检测路径统计: {get_encoding_stats()}")
+            logging.info(f"HTML精简统计: {get_minimizer_stats()}")
+            logging.info(f"对冲请求统计: {get_hedge_stats()}")
+            logging.info(f"主机调度统计: {get_scheduler_stats()}")
+            logging.info(f"自适应并发统计: {get_concurrency_stats()}")
+            logging.info(f"DNS缓存统计: {get_dns_stats()}")
         except Exception as e:
             self.error.emit(str(e))
             logging.error(f"工作线程搜索任务失败：{e}")
\ No newline at end of file